@@ -1,23 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import SessionLocal
 from app.models.user import User
 from app.schemas.auth import LoginRequest, TokenResponse
-from app.core.security import verify_password
+from app.core.rate_limit import login_ip_limiter, login_email_limiter
+from app.core.security import verify_password_async
 from app.core.jwt import create_access_token
-from app.core.deps import get_db # deps에서 가져오기
+from app.core.deps import get_db, release_connection # deps에서 가져오기
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/login", response_model=TokenResponse)
-def login(data: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == data.email).first()
+async def login(data: LoginRequest, request: Request, db: AsyncSession = Depends(get_db)):
+    # throttle before any bcrypt work (client IP: run uvicorn with --proxy-headers behind a proxy)
+    ip = request.client.host if request.client else "unknown"
+    email = data.email.lower()
+    retry_after = max(login_ip_limiter.retry_after(ip), login_email_limiter.retry_after(email))
+    if retry_after:
+        raise HTTPException(
+            status_code=429, detail="Too many login attempts", headers={"Retry-After": str(retry_after)}
+        )
+    login_ip_limiter.hit(ip)
+
+    user = await db.scalar(select(User).where(User.email == data.email))
     if not user:
+        login_email_limiter.hit(email)
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    if not verify_password(data.password, user.password_hash):
+    # bcrypt is CPU heavy: runs in the password process pool, without holding a DB connection
+    # (a login burst waiting on the pool would otherwise take every pooled connection)
+    await release_connection(db)
+    valid, new_hash = await verify_password_async(data.password, user.password_hash)
+    if not valid:
+        login_email_limiter.hit(email)
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    login_email_limiter.reset(email)
+
+    if new_hash:
+        # stored hash used another cost (BCRYPT_ROUNDS changed): replace it while we have the password
+        user.password_hash = new_hash
+        await db.commit()
 
-    token = create_access_token({"sub": str(user.id)})
+    # email claim: lets AUTH_STATELESS deployments authenticate without reading the users table
+    token = create_access_token({"sub": str(user.id), "email": user.email})
     return {"access_token": token}
@@ -1,223 +1,733 @@
-import shutil
+import hashlib
+import json
 import os
-from uuid import uuid4
-from fastapi import File, UploadFile
+import time
 
-from app.core.ai import generate_summary, generate_chat_answer
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import anyio
+from uuid import uuid4
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.core.ai import CHAT_FAILED_PREFIX, generate_chat_answer, stream_chat_answer
+from app.core.summarizer import SummaryProgress, summarize_document_text, stream_document_summary
+from app.core.answer_cache import answer_cache
+from app.core.config import UPLOAD_DIR, UPLOAD_MAX_BYTES
+from app.core.content_store import read_content, save_content_async
+from app.core.llm_gateway import LLMQueueFull
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from typing import List
-from app.core.deps import get_db, get_current_user
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError: # python-multipart < 0.0.13
+    import multipart
+    from multipart.multipart import parse_options_header
+
+from app.core.deps import get_db, get_current_user, release_connection
+from app.db.session import AsyncSessionLocal
 from app.models.document import Document
-from app.models.user import User
+from app.models.ingest_job import IngestJob, JOB_FAILED, JOB_KIND_REINDEX
+from app.core.auth_cache import Principal
 from app.schemas.document import (
     DocumentCreate,
     DocumentResponse,
+    DocumentListItem,
+    DocumentUploadResponse,
     DocumentUpdate,
+    IngestStatusResponse,
     ChatRequest,
     ChatResponse,
+    CollectionChatRequest,
+    CollectionChatResponse,
+    ChatContext,
+)
+from app.core.ingest import create_ingest_job, submit_ingest_job
+from app.core.vector_store import (
+    embed_query,
+    search_document_contexts,
+    search_corpus_contexts,
+    delete_document_from_vectorstore,
 )
-from app.core.parser import extract_text_from_file
-from app.core.vector_store import save_document_to_vectorstore, search_document_contexts
-from typing import List
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
+# document list page size (default / max)
+LIST_PAGE_SIZE = 50
+LIST_MAX_PAGE_SIZE = 200
+
+# multipart boundaries and part headers allowed on top of UPLOAD_MAX_BYTES in Content-Length
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+
 # Set directory to save files
-UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True) # create folder if no exists
 
-@router.post("/upload", response_model=DocumentResponse)
-def upload_document(
-    file: UploadFile = File(...), # take 'file' as necessary argument
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def _get_owned_document(db: AsyncSession, doc_id: int, current_user: Principal) -> Document:
+    """
+    load a document, 404 if not found / 403 if not owned by current user
+    """
+    doc = await db.get(Document, doc_id)
+
+    # 404 error if doc is not found
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    # 403 error if the doc is not owned by user(user_id)
+    if doc.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    return doc
+
+def _document_response(doc: Document, content: str | None = None) -> DocumentResponse:
+    """
+    response of a document (its text lives in the content store: pass it when the route has read it)
+    """
+    return DocumentResponse(
+        id=doc.id,
+        title=doc.title,
+        content=content,
+        owner_id=doc.owner_id,
+        file_path=doc.file_path,
+        summary=doc.summary,
+    )
+
+# characters of the document text used when retrieval finds nothing
+CHAT_FALLBACK_CHARS = 2000
+
+def _sse(data: dict, event: str | None = None) -> str:
+    """
+    format one Server-Sent Event
+    """
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+async def _sse_response(tokens, first_events: list[str] | None = None, on_complete=None) -> StreamingResponse:
+    """
+    wrap an async LLM token iterator as text/event-stream
+    the first token is awaited before the response starts, so time-to-first-token
+    can be sent in the X-Time-To-First-Token-Ms header (and again in the final 'done' event)
+    on_complete(text) is awaited with the full text when the stream ends
+    """
+    started = time.perf_counter()
+    try:
+        first_token = await anext(tokens, "")
+    except LLMQueueFull:
+        raise # 429 + Retry-After (app.main)
+    except Exception as e:
+        print(f"AI Stream Error: {e}")
+        raise HTTPException(status_code=502, detail=f"LLM stream failed: {e}")
+    ttft_ms = (time.perf_counter() - started) * 1000
+
+    async def event_stream():
+        for event in first_events or []:
+            yield event
+        parts = [first_token]
+        if first_token:
+            yield _sse({"token": first_token})
+        try:
+            async for token in tokens:
+                parts.append(token)
+                yield _sse({"token": token})
+        except Exception as e:
+            print(f"AI Stream Error: {e}")
+            yield _sse({"detail": str(e)}, event="error")
+            return
+
+        text = "".join(parts)
+        if on_complete:
+            await on_complete(text)
+        total_ms = (time.perf_counter() - started) * 1000
+        yield _sse({"text": text, "ttft_ms": round(ttft_ms, 1), "total_ms": round(total_ms, 1)}, event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no", # disable proxy buffering
+            "X-Time-To-First-Token-Ms": f"{ttft_ms:.1f}",
+        },
+    )
+
+def _summary_sse_response(items, on_complete) -> StreamingResponse:
+    """
+    text/event-stream for stream_document_summary: the response starts right away,
+    'progress' events ({"stage", "done", "total"}) while map/reduce runs, then the summary tokens
+    time-to-first-token is only known after the response started: it is in the final 'done' event
+    """
+    started = time.perf_counter()
+
+    async def event_stream():
+        parts = []
+        ttft_ms = None
+        try:
+            async for item in items:
+                if isinstance(item, SummaryProgress):
+                    yield _sse({"stage": item.stage, "done": item.done, "total": item.total}, event="progress")
+                    continue
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                parts.append(item)
+                yield _sse({"token": item})
+        except Exception as e:
+            print(f"AI Stream Error: {e}")
+            yield _sse({"detail": str(e)}, event="error")
+            return
+
+        text = "".join(parts)
+        await on_complete(text)
+        total_ms = (time.perf_counter() - started) * 1000
+        yield _sse(
+            {"text": text, "ttft_ms": round(ttft_ms or total_ms, 1), "total_ms": round(total_ms, 1)}, event="done"
+        )
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no", # disable proxy buffering
+        },
+    )
+
+def _multipart_parser(boundary: bytes, events: list):
+    """
+    streaming multipart parser; its callbacks cannot await, so they only append
+    ("headers", {name: value}) / ("data", bytes) / ("end", None) to events for the caller to handle
+    """
+    part = {"headers": {}, "field": b"", "value": b""}
+
+    def on_part_begin():
+        part["headers"] = {}
+
+    def on_header_field(data: bytes, start: int, end: int):
+        part["field"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["field"].lower()] = part["value"]
+        part["field"] = part["value"] = b""
+
+    def on_headers_finished():
+        events.append(("headers", part["headers"]))
+
+    def on_part_data(data: bytes, start: int, end: int):
+        events.append(("data", data[start:end]))
+
+    def on_part_end():
+        events.append(("end", None))
+
+    return multipart.MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+async def _save_upload(request: Request, file_location: str) -> tuple[str, str]:
+    """
+    stream the 'file' part of the multipart body straight to disk (no spooled temp copy first),
+    returns (filename, sha256 of the content)
+    413 (and no file left behind) when it is larger than UPLOAD_MAX_BYTES:
+    from Content-Length before anything is read, else as soon as the limit is passed
+    """
+    too_large = HTTPException(status_code=413, detail=f"File too large (max {UPLOAD_MAX_BYTES} bytes)")
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > UPLOAD_MAX_BYTES + UPLOAD_OVERHEAD_BYTES:
+        raise too_large
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data with a 'file' field")
+
+    events = []
+    parser = _multipart_parser(boundary, events)
+    hasher = hashlib.sha256()
+    size = 0
+    filename = None
+    in_file = False
+    try:
+        async with await anyio.open_file(file_location, "wb") as buffer:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                for kind, value in events:
+                    if kind == "headers":
+                        _, disposition = parse_options_header(value.get(b"content-disposition", b""))
+                        # only the first 'file' part is saved, other fields are ignored
+                        in_file = filename is None and disposition.get(b"name") == b"file" and b"filename" in disposition
+                        if in_file:
+                            filename = os.path.basename(disposition[b"filename"].decode("utf-8", "replace"))
+                    elif kind == "data" and in_file:
+                        size += len(value)
+                        if size > UPLOAD_MAX_BYTES:
+                            raise too_large
+                        hasher.update(value)
+                        await buffer.write(value)
+                    elif kind == "end":
+                        in_file = False
+                events.clear()
+            parser.finalize()
+        if not filename:
+            raise HTTPException(status_code=400, detail="File is required")
+    except multipart.exceptions.MultipartParseError:
+        await anyio.Path(file_location).unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail="Malformed multipart body")
+    except BaseException:
+        await anyio.Path(file_location).unlink(missing_ok=True)
+        raise
+
+    return filename, hasher.hexdigest()
+
+# the body is read by _save_upload (not by a File() parameter, which would spool it all first)
+UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "multipart/form-data": {
+            "schema": {
+                "type": "object",
+                "properties": {"file": {"type": "string", "format": "binary"}},
+                "required": ["file"],
+            }
+        }
+    },
+}
+
+@router.post("/upload", response_model=DocumentUploadResponse, openapi_extra={"requestBody": UPLOAD_REQUEST_BODY})
+async def upload_document(
+    request: Request, # multipart body with a 'file' part
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Upload file and create document
+    text extraction and vector indexing run in background (see /documents/{doc_id}/ingest-status)
+    uploading the same file again returns the existing document instead of re-ingesting it
     """
-    # 1. create unique file name (to prevent redundant)
+    # 1. Save file to server disk (sha256 computed while streaming)
+    # stored under a temporary name until the original file name has been read from the body
+    part_location = os.path.join(UPLOAD_DIR, f"{uuid4()}.part")
+    original_name, content_hash = await _save_upload(request, part_location)
+
+    # 2. Same file already uploaded by this user: reuse its content and vectors
+    existing = await db.scalar(
+        select(Document)
+        .where(Document.owner_id == current_user.id, Document.content_hash == content_hash)
+        .order_by(Document.id)
+        .limit(1)
+    )
+    if existing:
+        await anyio.Path(part_location).unlink(missing_ok=True)
+        job = await db.scalar(
+            select(IngestJob)
+            .where(IngestJob.document_id == existing.id)
+            .order_by(IngestJob.id.desc())
+            .limit(1)
+        )
+        resubmit = job is None or job.status == JOB_FAILED
+        if resubmit:
+            # previous ingest never succeeded: try again with the file we already have
+            job = create_ingest_job(db, existing.id)
+            await db.commit()
+            submit_ingest_job(job.id)
+
+        return DocumentUploadResponse(
+            **_document_response(existing).model_dump(),
+            job_id=job.id,
+            duplicate=True,
+        )
+
+    # 3. create unique file name (to prevent redundant), the extension is a format hint for the parser
     # ex: "a1b2c3d4-my_report.pdf"
-    filename = f"{uuid4()}-{file.filename}"
-    file_location = os.path.join(UPLOAD_DIR, filename)
-
-    # 2. Save file to server disk
-    with open(file_location, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # 3. Extract text from saved file
-    extracted_content = extract_text_from_file(file_location)
+    file_location = os.path.join(UPLOAD_DIR, f"{uuid4()}-{original_name}")
+    await anyio.Path(part_location).rename(file_location)
 
-    # 3. Save metadata to DB
-    # Set the title as filename at first with empty data
+    # 4. Save metadata to DB
+    # Set the title as filename at first with empty data (content is filled by ingest job)
     db_doc = Document(
-        title=file.filename,
+        title=original_name,
         file_path = file_location,
-        content=extracted_content,
+        content_hash=content_hash,
         owner_id=current_user.id
     )
-
     db.add(db_doc)
-    db.commit()
-    db.refresh(db_doc)
+    await db.flush()
 
-    # Store in vectorDB (prepare RAG)
-    # TODO: usually running in background task, run it async for now
+    # 5. Queue ingest job (parse -> chunk -> embed -> index)
+    job = create_ingest_job(db, db_doc.id)
+    await db.commit()
+    await db.refresh(db_doc)
 
-    try:
-        save_document_to_vectorstore(db_doc.id, extracted_content)
-    except Exception as e:
-        print(f"Vector DB Error: {e}")
-        # TODO: should be decided if considering success in upload even if storing vector is failed
-        # just leaving log here for now
-    return db_doc
+    submit_ingest_job(job.id)
+
+    return DocumentUploadResponse(
+        **_document_response(db_doc).model_dump(),
+        job_id=job.id,
+    )
+
+@router.get("/{doc_id}/ingest-status", response_model=IngestStatusResponse)
+async def get_ingest_status(
+    doc_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    stage, progress and error of the latest ingest job of a document
+    """
+    await _get_owned_document(db, doc_id, current_user)
+
+    job = await db.scalar(
+        select(IngestJob)
+        .where(IngestJob.document_id == doc_id)
+        .order_by(IngestJob.id.desc())
+        .limit(1)
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="No ingest job for this document")
+
+    return job
+
+@router.post("/chat", response_model=CollectionChatResponse)
+async def chat_with_documents(
+    payload: CollectionChatRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Ask one question across all of my documents (or the chosen doc_ids) in one retrieval query.
+    """
+    question = payload.question.strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="Question is required")
+
+    owned_ids = await db.scalars(select(Document.id).where(Document.owner_id == current_user.id))
+    owned_ids = set(owned_ids.all())
+
+    doc_ids = None
+    if payload.doc_ids is not None:
+        doc_ids = list(dict.fromkeys(payload.doc_ids))
+        missing = [doc_id for doc_id in doc_ids if doc_id not in owned_ids]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Document not found: {missing}")
+    # no more queries: do not hold a DB connection while searching and waiting on the LLM
+    await release_connection(db)
+
+    hits = []
+    if owned_ids and doc_ids != []:
+        hits = await run_in_threadpool(
+            search_corpus_contexts,
+            owner_id=current_user.id,
+            query=question,
+            k=4,
+            doc_ids=doc_ids,
+            keyword_doc_ids=doc_ids if doc_ids is not None else sorted(owned_ids),
+        )
+
+    answer = await generate_chat_answer(question=question, contexts=[text for _, text in hits])
+    return CollectionChatResponse(
+        question=question,
+        answer=answer,
+        contexts=[ChatContext(doc_id=doc_id, text=text) for doc_id, text in hits],
+    )
 
 @router.post("", response_model=DocumentResponse)
-def create_document(
-    doc_in: DocumentCreate, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user) # 인증된 유저만 가능!
+async def create_document(
+    doc_in: DocumentCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user) # 인증된 유저만 가능!
 ):
     db_doc = Document(
-        **doc_in.model_dump(),
+        title=doc_in.title,
         owner_id=current_user.id # 현재 로그인한 유저 ID를 자동으로 넣음
     )
     db.add(db_doc)
-    db.commit()
-    db.refresh(db_doc)
-    return db_doc
-
-@router.get("", response_model=List[DocumentResponse])
-def read_documents(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    await db.flush()
+
+    job = None
+    if doc_in.content:
+        await save_content_async(db, db_doc.id, doc_in.content)
+        # index the given text for retrieval (no file to parse)
+        job = create_ingest_job(db, db_doc.id, kind=JOB_KIND_REINDEX)
+    await db.commit()
+    await db.refresh(db_doc)
+
+    if job:
+        submit_ingest_job(job.id)
+    return _document_response(db_doc, doc_in.content)
+
+async def _list_documents(
+    db: AsyncSession, current_user: Principal, request: Request, response: Response, limit: int, before_id: int | None
+):
+    """
+    one page of the current user's documents, newest first (keyset: id < before_id)
+    - only list columns are loaded (content / summary stay in the database)
+    - X-Next-Cursor: before_id of the next page (absent on the last page)
+    - ETag of the page: an unchanged page is answered with 304 when the client sends If-None-Match
+    """
+    query = (
+        select(Document)
+        .options(load_only(Document.id, Document.title, Document.owner_id, Document.file_path))
+        .where(Document.owner_id == current_user.id)
+    )
+    if before_id is not None:
+        query = query.where(Document.id < before_id)
+    docs = (await db.scalars(query.order_by(Document.id.desc()).limit(limit))).all()
+
+    items = [DocumentListItem.model_validate(doc) for doc in docs]
+    next_cursor = str(items[-1].id) if len(items) == limit else None
+
+    body = json.dumps([item.model_dump() for item in items], ensure_ascii=False, sort_keys=True)
+    etag = f'W/"{hashlib.sha256(f"{next_cursor}:{body}".encode("utf-8")).hexdigest()[:32]}"'
+    headers = {"ETag": etag}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+
+    if etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return items
+
+@router.get("", response_model=List[DocumentListItem])
+async def read_documents(
+    request: Request,
+    response: Response,
+    limit: int = Query(LIST_PAGE_SIZE, ge=1, le=LIST_MAX_PAGE_SIZE),
+    before_id: int | None = Query(None, description="X-Next-Cursor of the previous page"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     # 내가 올린 문서만 조회하기
-    return db.query(Document).filter(Document.owner_id == current_user.id).all()
+    return await _list_documents(db, current_user, request, response, limit, before_id)
 
 @router.get("/{doc_id}", response_model=DocumentResponse)
-def read_document(
+async def read_document(
     doc_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    doc = db.query(Document).filter(Document.id == doc_id).first()
-
-    # 404 error if doc is not found
-    if not doc:
-        raise HTTPException(status_code=404, detail="Document not found")
-
-    # 403 error if the doc is not owned by user(user_id)
-    if doc.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-
-    return doc
+    doc = await _get_owned_document(db, doc_id, current_user)
+    return _document_response(doc, await read_content(db, doc.id))
 
 @router.put("/{doc_id}", response_model=DocumentResponse)
-def update_document(
+async def update_document(
     doc_id: int,
     doc_in: DocumentUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    doc = db.query(Document).filter(Document.id == doc_id).first()
-
-    if not doc:
-        raise HTTPException(status_code=404, detail="Document not found")
-
-    if doc.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    doc = await _get_owned_document(db, doc_id, current_user)
 
     update_data = doc_in.model_dump(exclude_unset=True)
 
+    content = await read_content(db, doc.id)
+    content_changed = "content" in update_data and (update_data["content"] or "") != content
+    new_content = update_data.pop("content", None)
+
     for key, value in update_data.items():
         setattr(doc, key, value)
 
-    db.commit()
-    db.refresh(doc)
-    return doc
+    job = None
+    if content_changed:
+        content = new_content or ""
+        await save_content_async(db, doc.id, content)
+        # re-chunk in background: only changed chunks are re-embedded, removed ones are deleted
+        job = create_ingest_job(db, doc.id, kind=JOB_KIND_REINDEX)
+    await db.commit()
+    await db.refresh(doc)
+
+    if job:
+        # cached answers were based on the old content
+        answer_cache.invalidate(doc_id)
+        submit_ingest_job(job.id)
+    return _document_response(doc, content)
 
 @router.delete("/{doc_id}")
-def delete_document(
+async def delete_document(
     doc_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    doc = db.query(Document).filter(Document.id == doc_id).first()
-    if not doc:
-        raise HTTPException(status_code=404, detail="Document not found")
+    doc = await _get_owned_document(db, doc_id, current_user)
 
-    if doc.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    await db.delete(doc)
+    await db.commit()
+    answer_cache.invalidate(doc_id)
 
-    db.delete(doc)
-    db.commit()
+    # remove its chunks from vector DB (+ keyword index)
+    try:
+        await run_in_threadpool(delete_document_from_vectorstore, doc_id)
+    except Exception as e:
+        # row is gone already: leftover vectors are purged by `python -m app.cli gc-vectors`
+        print(f"Vector DB Error: {e}")
     return {"status": "deleted", "id": doc_id}
 
-@router.get("/", response_model=List[DocumentResponse])
-def get_my_documents(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+@router.get("/", response_model=List[DocumentListItem])
+async def get_my_documents(
+    request: Request,
+    response: Response,
+    limit: int = Query(LIST_PAGE_SIZE, ge=1, le=LIST_MAX_PAGE_SIZE),
+    before_id: int | None = Query(None, description="X-Next-Cursor of the previous page"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
-    get a list of all uploaded document
+    get a page of uploaded documents (newest first, full document: GET /documents/{doc_id})
     """
-    docs = db.query(Document).filter(Document.owner_id == current_user.id).order_by(Document.id.desc()).all()
-    return docs
+    return await _list_documents(db, current_user, request, response, limit, before_id)
 
 @router.post("/{doc_id}/summarize", response_model=DocumentResponse)
-def summarize_document(
+async def summarize_document(
     doc_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Summarize a document using AI
     """
     # 1. Search a document
-    doc = db.query(Document).filter(Document.id == doc_id).first()
-
-    if not doc:
-        raise HTTPException(status_code=404, detail="Document not found")
-    if doc.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permission")
-    if not doc.content:
+    doc = await _get_owned_document(db, doc_id, current_user)
+    # the whole text is needed (every chunk is summarized), read it only once the document is known to be owned
+    content = await read_content(db, doc.id)
+    if not content:
         raise HTTPException(status_code=400, detail="Document has no content")
+    # summarizing takes a while: give the connection back, saving the result checks out a new one
+    await release_connection(db)
 
-    # 2. AI summarize
-    summary_text = generate_summary(doc.content)
+    # 2. AI summarize (map-reduce over chunks, cached per chunk)
+    summary_text = await summarize_document_text(content)
 
     # 3. Save result
     doc.summary = summary_text
-    db.commit()
-    db.refresh(doc)
+    await db.commit()
+    await db.refresh(doc)
 
-    return doc
+    return _document_response(doc)
 
 
 @router.post("/{doc_id}/chat", response_model=ChatResponse)
-def chat_with_document(
+async def chat_with_document(
     doc_id: int,
     payload: ChatRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
 ):
     """
     Ask a question to a single document using retrieved chunks.
     """
-    doc = db.query(Document).filter(Document.id == doc_id).first()
-    if not doc:
-        raise HTTPException(status_code=404, detail="Document not found")
-    if doc.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permission")
+    doc = await _get_owned_document(db, doc_id, current_user)
 
     question = payload.question.strip()
     if not question:
         raise HTTPException(status_code=400, detail="Question is required")
+    # no DB connection held while embedding / waiting on the LLM
+    await release_connection(db)
 
-    contexts = search_document_contexts(doc_id=doc.id, query=question, k=4)
-    if not contexts and doc.content:
-        contexts = [doc.content[:2000]]
+    # embedding / vector search are blocking: run them in threadpool
+    query_vector = await run_in_threadpool(embed_query, question)
 
-    answer = generate_chat_answer(question=question, contexts=contexts)
+    # same or near-identical question asked before about this document
+    cached = answer_cache.lookup(doc.id, question, query_vector)
+    if cached:
+        return ChatResponse(question=question, answer=cached.answer, contexts=cached.contexts)
+
+    contexts = await run_in_threadpool(
+        search_document_contexts, doc_id=doc.id, query=question, k=4, query_vector=query_vector
+    )
+    if not contexts:
+        # only the first characters of the text are read from the content store
+        fallback = await read_content(db, doc.id, 0, CHAT_FALLBACK_CHARS)
+        contexts = [fallback] if fallback else []
+        await release_connection(db)
+
+    answer = await generate_chat_answer(question=question, contexts=contexts)
+    if not answer.startswith(CHAT_FAILED_PREFIX):
+        answer_cache.store(doc.id, question, query_vector, answer, contexts)
     return ChatResponse(question=question, answer=answer, contexts=contexts)
+
+
+@router.post("/{doc_id}/summarize/stream")
+async def summarize_document_stream(
+    doc_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Summarize a document using AI, streaming tokens as Server-Sent Events
+    'progress' events (chunks summarized n/N) come first, while the map/reduce steps run
+    the finished summary is saved to the document like /summarize
+    """
+    doc = await _get_owned_document(db, doc_id, current_user)
+    content = await read_content(db, doc.id)
+    if not content:
+        raise HTTPException(status_code=400, detail="Document has no content")
+    # the stream can last minutes: the connection goes back to the pool before it starts
+    await release_connection(db)
+
+    async def save_summary(summary_text: str):
+        # request session may already be closed while streaming: use a new one
+        async with AsyncSessionLocal() as save_db:
+            await save_db.execute(
+                update(Document).where(Document.id == doc_id).values(summary=summary_text)
+            )
+            await save_db.commit()
+
+    # map/reduce can take minutes on a long document: progress events are streamed while it runs
+    return _summary_sse_response(stream_document_summary(content), on_complete=save_summary)
+
+
+@router.post("/{doc_id}/chat/stream")
+async def chat_with_document_stream(
+    doc_id: int,
+    payload: ChatRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Streaming version of /chat: retrieved contexts first ('contexts' event), then answer tokens
+    """
+    doc = await _get_owned_document(db, doc_id, current_user)
+
+    question = payload.question.strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="Question is required")
+    # no DB connection held while embedding / streaming the answer
+    await release_connection(db)
+
+    query_vector = await run_in_threadpool(embed_query, question)
+
+    cached = answer_cache.lookup(doc.id, question, query_vector)
+    if cached:
+        async def cached_tokens():
+            yield cached.answer
+
+        return await _sse_response(
+            cached_tokens(),
+            first_events=[_sse({"question": question, "contexts": cached.contexts}, event="contexts")],
+        )
+
+    contexts = await run_in_threadpool(
+        search_document_contexts, doc_id=doc.id, query=question, k=4, query_vector=query_vector
+    )
+    if not contexts:
+        # only the first characters of the text are read from the content store
+        fallback = await read_content(db, doc.id, 0, CHAT_FALLBACK_CHARS)
+        contexts = [fallback] if fallback else []
+        await release_connection(db)
+
+    async def store_answer(answer: str):
+        answer_cache.store(doc_id, question, query_vector, answer, contexts)
+
+    return await _sse_response(
+        stream_chat_answer(question=question, contexts=contexts),
+        first_events=[_sse({"question": question, "contexts": contexts}, event="contexts")],
+        on_complete=store_answer,
+    )
@@ -1,7 +1,15 @@
 from fastapi import APIRouter
 
+from app.core.metrics import snapshot
+from app.db.session import update_pool_gauges
+
 router = APIRouter()
 
 @router.get("/health")
 def health_check():
-    return {"status":"ok"}
\ No newline at end of file
+    return {"status":"ok"}
+
+@router.get("/metrics")
+def read_metrics():
+    update_pool_gauges()
+    return snapshot()
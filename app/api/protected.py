@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends
 from app.core.deps import get_current_user
-from app.models.user import User
+from app.core.auth_cache import Principal
 
 router = APIRouter(prefix="/protected", tags=["protected"])
 
 @router.get("")
-def protected_api(current_user: User = Depends(get_current_user)):
+def protected_api(current_user: Principal = Depends(get_current_user)):
     return {
         "message": "You are authenticated",
         "user_id": current_user.id,
@@ -1,16 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.db.session import SessionLocal
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse
-from app.core.security import hash_password
-from app.core.deps import get_db # deps에서 가져오기
+from app.core.security import hash_password_async
+from app.core.deps import get_db, release_connection # deps에서 가져오기
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.post("", response_model=UserResponse)
-def create_user(user: UserCreate, db:Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     pw_bytes = user.password.encode("utf-8")
     if len(pw_bytes) > 72:
         raise HTTPException(
@@ -18,24 +18,27 @@ def create_user(user: UserCreate, db:Session = Depends(get_db)):
             detail="Password too long (bcrypt supports up to 72 bytes). Use a shorter password."
         )
     
-    existing = db.query(User).filter(User.email == user.email).first()
+    existing = await db.scalar(select(User).where(User.email == user.email))
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
+    # no DB connection held while waiting on the password pool
+    await release_connection(db)
 
     db_user = User(
         email=user.email,
-        password_hash = hash_password(user.password),
+        # bcrypt is CPU heavy: runs in the password process pool
+        password_hash = await hash_password_async(user.password),
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
 
     return db_user
 
 @router.get("", response_model=List[UserResponse])
-def get_users(db: Session = Depends(get_db)):
+async def get_users(db: AsyncSession = Depends(get_db)):
     """
     Get a list of all registered user
     """
-    users = db.query(User).all()
-    return users
+    users = await db.scalars(select(User))
+    return users.all()
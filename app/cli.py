@@ -0,0 +1,165 @@
+"""
+Offline maintenance commands
+
+    python -m app.cli backfill-chunk-owner   # add owner_id to chunks indexed before corpus chat
+    python -m app.cli gc-vectors [--dry-run]  # purge vectors whose document row no longer exists
+    python -m app.cli copy-vectors --from chroma --to pgvector  # move vectors to another backend
+    python -m app.cli migrate-content         # move documents.content into the segmented content store
+    python -m app.cli backfill-content-hash   # sha256 of files uploaded before duplicate detection
+"""
+import argparse
+import hashlib
+import os
+from itertools import groupby
+
+from app.core.content_store import save_content
+from app.core.keyword_index import list_keyword_index_doc_ids
+from app.core.vector_backends import create_vector_backend
+from app.core.vector_store import (
+    backfill_owner_metadata,
+    delete_document_from_vectorstore,
+    embeddings,
+    list_indexed_doc_ids,
+)
+from app.db.session import SessionLocal
+from app.models.document import Document
+
+
+def backfill_chunk_owner(args):
+    db = SessionLocal()
+    try:
+        owner_by_doc = {doc_id: owner_id for doc_id, owner_id in db.query(Document.id, Document.owner_id)}
+    finally:
+        db.close()
+
+    updated = backfill_owner_metadata(owner_by_doc)
+    print(f"Added owner_id to {updated} chunks.")
+
+
+def gc_vectors(args):
+    indexed = list_indexed_doc_ids() | list_keyword_index_doc_ids()
+
+    db = SessionLocal()
+    try:
+        existing = {doc_id for (doc_id,) in db.query(Document.id)}
+    finally:
+        db.close()
+
+    orphans = sorted(indexed - existing)
+    print(f"{len(indexed)} indexed documents, {len(orphans)} without a document row.")
+    if args.dry_run:
+        print(f"Orphans: {orphans}")
+        return
+
+    for doc_id in orphans:
+        delete_document_from_vectorstore(doc_id)
+    print(f"Purged vectors of {len(orphans)} documents.")
+
+
+def copy_vectors(args):
+    # same chunk IDs in both backends, so document_chunks stays valid and nothing is embedded again
+    source = create_vector_backend(args.source, embeddings)
+    target = create_vector_backend(args.target, embeddings)
+    source.open()
+    target.open()
+
+    db = SessionLocal()
+    try:
+        existing = {doc_id for (doc_id,) in db.query(Document.id)}
+    finally:
+        db.close()
+
+    copied = skipped = 0
+    for batch in source.iter_all():
+        for (doc_id, owner_id), rows in groupby(batch, key=lambda row: (row[1], row[2])):
+            rows = list(rows)
+            if doc_id not in existing:
+                skipped += len(rows)
+                continue
+            target.upsert(
+                doc_id,
+                owner_id,
+                ids=[row[0] for row in rows],
+                vectors=[row[3] for row in rows],
+                texts=[row[4] for row in rows],
+            )
+            copied += len(rows)
+
+    source.close()
+    target.close()
+    print(f"Copied {copied} chunks from {args.source} to {args.target} ({skipped} orphaned chunks skipped).")
+
+
+def migrate_content(args):
+    # one document per transaction: a large corpus is never held in memory at once
+    db = SessionLocal()
+    try:
+        doc_ids = [doc_id for (doc_id,) in db.query(Document.id).filter(Document.content.isnot(None)).order_by(Document.id)]
+        for doc_id in doc_ids:
+            (content,) = db.query(Document.content).filter(Document.id == doc_id).one()
+            save_content(db, doc_id, content or "")
+            db.commit()
+    finally:
+        db.close()
+    print(f"Moved the text of {len(doc_ids)} documents to the content store.")
+
+
+def _file_sha256(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def backfill_content_hash(args):
+    # same hash as an upload (sha256 of the file bytes), so re-uploading an old file is detected as a duplicate
+    db = SessionLocal()
+    updated = missing = 0
+    try:
+        docs = (
+            db.query(Document.id, Document.file_path)
+            .filter(Document.content_hash.is_(None), Document.file_path.isnot(None))
+            .order_by(Document.id)
+            .all()
+        )
+        for doc_id, file_path in docs:
+            if not os.path.isfile(file_path):
+                missing += 1
+                continue
+            db.query(Document).filter(Document.id == doc_id).update({Document.content_hash: _file_sha256(file_path)})
+            db.commit()
+            updated += 1
+    finally:
+        db.close()
+    print(f"Stored the file hash of {updated} documents ({missing} files not found).")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Docs backend maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill-chunk-owner", help="add owner_id metadata to old vector chunks")
+    backfill.set_defaults(func=backfill_chunk_owner)
+
+    gc = commands.add_parser("gc-vectors", help="purge vectors / keyword indexes of deleted documents")
+    gc.add_argument("--dry-run", action="store_true", help="only list orphaned doc_ids")
+    gc.set_defaults(func=gc_vectors)
+
+    copy = commands.add_parser("copy-vectors", help="copy stored vectors between backends (no re-embedding)")
+    copy.add_argument("--from", dest="source", choices=["chroma", "pgvector", "quantized"], required=True)
+    copy.add_argument("--to", dest="target", choices=["chroma", "pgvector", "quantized"], required=True)
+    copy.set_defaults(func=copy_vectors)
+
+    migrate = commands.add_parser("migrate-content", help="move documents.content into the content store")
+    migrate.set_defaults(func=migrate_content)
+
+    content_hash = commands.add_parser("backfill-content-hash", help="hash files uploaded before duplicate detection")
+    content_hash.set_defaults(func=backfill_content_hash)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
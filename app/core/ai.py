@@ -1,86 +1,171 @@
-from openai import OpenAI
-import os
+import hashlib
+import json
+import time
+
+from app.core import metrics
+from app.core.config import LLM_MODEL
+from app.core.context_packer import estimate_tokens, pack_contexts
+from app.core.llm_gateway import gateway, LLMQueueFull, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+from app.core.llm_pool import llm_pool
 
 # 1. Client
-# when using local LLM
-# base_url = "http://localhost:11434/v1"
+# LLM_LOCATION (local Ollama / remote OpenAI), LLM_MODEL and LLM_ENDPOINTS come from the environment;
+# every call goes through llm_pool (least busy healthy endpoint, failover to the others)
 
-LLM_LOCATION = 'local'
-LLM_MODEL = 'qwen3:14b'
+# prefix of the answer returned when the LLM call failed (never cache these)
+CHAT_FAILED_PREFIX = "Chat failed"
 
-if LLM_LOCATION == 'local':
-    client = OpenAI(
-        base_url="http://localhost:11434/v1",
-        api_key="ollama"
-    )
-else:
-    client = OpenAI(
-        api_key = os.getenv("OPENAI_API_KEY", "sk-proj-..."),
+SUMMARY_SYSTEM_PROMPT = "너는 유능한 요약 비서야. 다음 내용을 한국어로 3줄 요약해줘."
+# map step of map-reduce summarization (one chunk / group of partial summaries)
+PARTIAL_SUMMARY_SYSTEM_PROMPT = (
+    "너는 유능한 요약 비서야. 다음은 긴 문서의 일부야. "
+    "핵심 사실과 수치를 빠뜨리지 말고 한국어로 간결하게 요약해줘."
+)
+CHAT_SYSTEM_PROMPT = (
+    "너는 문서 QA 비서다. 반드시 제공된 문맥 안에서만 답하고, "
+    "근거가 부족하면 모른다고 말해라. 답변은 한국어로 간결하게 작성해라."
+)
+
+def _summary_messages(text: str, system_prompt: str) -> list[dict]:
+    # long documents are split by app.core.summarizer (map-reduce) before reaching here
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": text},
+    ]
+
+def _chat_messages(question: str, contexts: list[str]) -> list[dict]:
+    # ranked chunks -> deduplicated and packed up to CONTEXT_TOKEN_BUDGET
+    contexts = pack_contexts(contexts)
+    if contexts:
+        context_text = "\n\n".join(contexts)
+    else:
+        context_text = "관련 문맥을 찾지 못했습니다."
+
+    return [
+        {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": (
+                f"[문맥]\n{context_text}\n\n"
+                f"[질문]\n{question}"
+            ),
+        },
+    ]
+
+async def _stream_completion(name: str, messages: list[dict], temperature: float):
+    """
+    async-yield content tokens as the model produces them
+    time-to-first-token (prefill) and total time are recorded as llm.<name>.ttft / llm.<name>.total,
+    prompt size as llm.<name>.prompt_tokens (server usage when reported, else estimated)
+    """
+    started = time.perf_counter()
+    ttft = None
+    prompt_tokens = None
+    async with llm_pool.stream(
+        lambda client: client.chat.completions.create(
+            model=LLM_MODEL,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+    ) as stream:
+        async for event in stream:
+            if getattr(event, "usage", None):
+                prompt_tokens = event.usage.prompt_tokens
+            if not event.choices:
+                continue
+            token = event.choices[0].delta.content
+            if not token:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - started
+                metrics.observe(f"llm.{name}.ttft", ttft)
+            yield token
+    total = time.perf_counter() - started
+    metrics.observe(f"llm.{name}.total", total)
+
+    if prompt_tokens is None:
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+    metrics.record_value(f"llm.{name}.prompt_tokens", prompt_tokens)
+    print(
+        f"LLM {name}: {prompt_tokens} prompt tokens, "
+        f"ttft {(ttft or total) * 1000:.0f}ms, total {total * 1000:.0f}ms"
     )
 
-def generate_summary(text: str) -> str:
+def _prompt_key(messages: list[dict], temperature: float) -> str:
+    # identical in-flight prompts share one LLM call (see app.core.llm_gateway)
+    payload = json.dumps([LLM_MODEL, messages, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+async def _stream_in_slot(name: str, messages: list[dict], temperature: float, priority: int):
     """
-    summary input text in 3 lines
+    _stream_completion holding a gateway slot until the stream ends
     """
-    if not text:
-        return "Empty content"
+    async with gateway.slot(priority):
+        async for token in _stream_completion(name, messages, temperature):
+            yield token
 
-    try:
-        # Use only first 3000 characters for too long text
-        # in order to decrease token usage
-        # (chunking with langchain later)
-        truncated_text = text[:3000]
-
-        response = client.chat.completions.create(
-            model = LLM_MODEL,
-#            model="gpt-3.5-turbo", # or local LLM model
-            messages=[
-                {"role": "system", "content": "너는 유능한 요약 비서야. 다음 내용을 한국어로 3줄 요약해줘."},
-                {"role": "user", "content": truncated_text},
-            ],
-            temperature=0.7,
+async def summarize_text(text: str, system_prompt: str = SUMMARY_SYSTEM_PROMPT,
+                         temperature: float = 0.7) -> str:
+    """
+    one summarization call (raises on LLM errors, callers decide what to show)
+    batch priority: waits behind interactive chat in the gateway queue
+    """
+    messages = _summary_messages(text, system_prompt)
+
+    async def call():
+        response = await llm_pool.call(
+            lambda client: client.chat.completions.create(
+                model=LLM_MODEL,
+                messages=messages,
+                temperature=temperature,
+            )
         )
         return response.choices[0].message.content
 
-    except Exception as e:
-        print(f"AI Error: {e}")
-        return f"Summary failed: {str(e)}"
+    return await gateway.run(_prompt_key(messages, temperature), call, priority=PRIORITY_BATCH)
 
 
-def generate_chat_answer(question: str, contexts: list[str]) -> str:
+async def generate_chat_answer(question: str, contexts: list[str]) -> str:
     """
     Answer a question using retrieved document contexts.
     """
     if not question.strip():
         return "질문이 비어 있습니다."
 
-    if contexts:
-        context_text = "\n\n".join(contexts[:4])
-    else:
-        context_text = "관련 문맥을 찾지 못했습니다."
+    messages = _chat_messages(question, contexts)
+
+    async def call():
+        # streamed internally so prefill time (time to first token) can be measured
+        tokens = [token async for token in _stream_completion("chat", messages, temperature=0.2)]
+        return "".join(tokens)
 
     try:
-        response = client.chat.completions.create(
-            model=LLM_MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "너는 문서 QA 비서다. 반드시 제공된 문맥 안에서만 답하고, "
-                        "근거가 부족하면 모른다고 말해라. 답변은 한국어로 간결하게 작성해라."
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": (
-                        f"[문맥]\n{context_text}\n\n"
-                        f"[질문]\n{question}"
-                    ),
-                },
-            ],
-            temperature=0.2,
-        )
-        return response.choices[0].message.content
+        return await gateway.run(_prompt_key(messages, 0.2), call, priority=PRIORITY_INTERACTIVE)
+    except LLMQueueFull:
+        raise # answered with 429 + Retry-After
     except Exception as e:
         print(f"AI Chat Error: {e}")
-        return f"Chat failed: {str(e)}"
+        return f"{CHAT_FAILED_PREFIX}: {str(e)}"
+
+
+async def stream_summary(text: str, system_prompt: str = SUMMARY_SYSTEM_PROMPT):
+    """
+    streaming version of summarize_text (async-yields tokens)
+    """
+    messages = _summary_messages(text, system_prompt)
+    async for token in _stream_in_slot("summary", messages, temperature=0.7, priority=PRIORITY_BATCH):
+        yield token
+
+
+async def stream_chat_answer(question: str, contexts: list[str]):
+    """
+    streaming version of generate_chat_answer (async-yields tokens)
+    """
+    if not question.strip():
+        yield "질문이 비어 있습니다."
+        return
+    messages = _chat_messages(question, contexts)
+    async for token in _stream_in_slot("chat", messages, temperature=0.2, priority=PRIORITY_INTERACTIVE):
+        yield token
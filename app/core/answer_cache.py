@@ -0,0 +1,144 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from itertools import count
+
+import numpy as np
+
+from app.core import metrics
+from app.core.config import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_THRESHOLD
+
+
+@dataclass
+class CachedAnswer:
+    doc_id: int
+    question: str
+    vector: np.ndarray # normalized question embedding (float32)
+    answer: str
+    contexts: list[str] = field(default_factory=list)
+    expires_at: float = 0.0
+    guard: tuple = () # question_guard(question)
+
+
+def _normalize(vector: list[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(vector)) or 1.0
+    return vector / norm
+
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+# english negations, korean negative endings / verbs (않다, 없다, 못하다, 아니다)
+_NEGATION = re.compile(r"n't\b|\b(?:not|no|never|none|nor|neither|without|except)\b|않|없|못|아니", re.IGNORECASE)
+
+
+def question_guard(question: str) -> tuple:
+    """
+    parts of a question embeddings barely see: the numbers it contains and how many negations.
+    two questions only share an answer when these are equal (ex: revenue in 2022 / in 2023,
+    "is X covered" / "is X not covered" are close in embedding space)
+    """
+    return tuple(sorted(set(_NUMBER.findall(question)))), len(_NEGATION.findall(question))
+
+
+class SemanticAnswerCache:
+    """
+    per-document answer cache keyed by question embedding
+    - a lookup hits when cosine(question, cached question) >= threshold and both questions have
+      the same question_guard (numbers, negations)
+    - a document's question vectors are kept as one matrix: a lookup is a single matrix-vector product
+    - entries expire after ttl_seconds; least recently used entries are evicted past max_entries
+    - invalidate(doc_id) drops every answer of a document (content changed / re-ingested)
+    in-process only: with several API workers each one keeps its own cache
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._entries: OrderedDict[int, CachedAnswer] = OrderedDict()
+        self._by_doc: dict[int, set[int]] = {}
+        # doc_id -> (entry ids, stacked vectors), rebuilt on the next lookup after the document's entries change
+        self._matrices: dict[int, tuple[list[int], np.ndarray]] = {}
+        self._ids = count()
+        self._lock = threading.Lock()
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        self._matrices.pop(entry.doc_id, None)
+        doc_entries = self._by_doc.get(entry.doc_id)
+        if doc_entries is not None:
+            doc_entries.discard(entry_id)
+            if not doc_entries:
+                del self._by_doc[entry.doc_id]
+
+    def _matrix(self, doc_id: int) -> tuple[list[int], np.ndarray | None]:
+        cached = self._matrices.get(doc_id)
+        if cached is None:
+            ids = list(self._by_doc.get(doc_id, ()))
+            if not ids:
+                return [], None
+            cached = self._matrices[doc_id] = (ids, np.stack([self._entries[entry_id].vector for entry_id in ids]))
+        return cached
+
+    def lookup(self, doc_id: int, question: str, vector: list[float]) -> CachedAnswer | None:
+        query = _normalize(vector)
+        guard = question_guard(question)
+        now = time.monotonic()
+        best_id = None
+
+        with self._lock:
+            for entry_id in [i for i in self._by_doc.get(doc_id, ()) if self._entries[i].expires_at <= now]:
+                self._remove(entry_id)
+
+            ids, matrix = self._matrix(doc_id)
+            if ids:
+                scores = matrix @ query
+                # most similar first; the first one above threshold with the same guard wins
+                for index in np.argsort(-scores):
+                    if scores[index] < self.threshold:
+                        break
+                    if self._entries[ids[index]].guard == guard:
+                        best_id = ids[index]
+                        break
+
+            if best_id is None:
+                metrics.incr("answer_cache.miss")
+                return None
+            self._entries.move_to_end(best_id)
+            metrics.incr("answer_cache.hit")
+            return self._entries[best_id]
+
+    def store(self, doc_id: int, question: str, vector: list[float], answer: str, contexts: list[str]):
+        entry = CachedAnswer(
+            doc_id=doc_id,
+            question=question,
+            vector=_normalize(vector),
+            answer=answer,
+            contexts=list(contexts),
+            expires_at=time.monotonic() + self.ttl_seconds,
+            guard=question_guard(question),
+        )
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = entry
+            self._by_doc.setdefault(doc_id, set()).add(entry_id)
+            self._matrices.pop(doc_id, None)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                metrics.incr("answer_cache.evicted")
+            metrics.set_gauge("answer_cache.size", len(self._entries))
+
+    def invalidate(self, doc_id: int):
+        with self._lock:
+            for entry_id in list(self._by_doc.get(doc_id, ())):
+                self._remove(entry_id)
+            metrics.set_gauge("answer_cache.size", len(self._entries))
+
+
+answer_cache = SemanticAnswerCache(
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    threshold=ANSWER_CACHE_THRESHOLD,
+)
@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import event
+
+from app.core import metrics
+from app.core.config import AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS
+from app.models.user import User
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    authenticated user as seen by the routes (no ORM object: safe to share between requests)
+    """
+    id: int
+    email: str
+
+
+class AuthCache:
+    """
+    access token -> Principal, so a repeated token skips both JWT decoding and the users lookup
+    - entries live ttl_seconds at most, never past the token's own exp
+    - least recently used entries are evicted past max_entries
+    - invalidate_user(user_id) drops every token of a user (row updated / deleted)
+    in-process only: with several API workers, ttl_seconds bounds how long another worker may serve a stale user
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[Principal, float]] = OrderedDict()
+        self._by_user: dict[int, set[str]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def _remove(self, token: str):
+        principal, _ = self._entries.pop(token)
+        tokens = self._by_user.get(principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[principal.id]
+
+    def _count(self, hit: bool):
+        if hit:
+            self._hits += 1
+        else:
+            self._misses += 1
+        metrics.incr("auth_cache.hit" if hit else "auth_cache.miss")
+        metrics.set_gauge("auth_cache.hit_rate", self._hits / (self._hits + self._misses))
+
+    def get(self, token: str) -> Principal | None:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[1] <= time.monotonic():
+                self._remove(token)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(token)
+            self._count(entry is not None)
+            return entry[0] if entry else None
+
+    def store(self, token: str, principal: Principal, token_expires_at: float | None = None):
+        """
+        token_expires_at: the token's exp claim (unix time)
+        """
+        ttl = self.ttl_seconds
+        if token_expires_at is not None:
+            ttl = min(ttl, token_expires_at - time.time())
+        if ttl <= 0:
+            return
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (principal, time.monotonic() + ttl)
+            self._by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                metrics.incr("auth_cache.evicted")
+            metrics.set_gauge("auth_cache.size", len(self._entries))
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in list(self._by_user.get(user_id, ())):
+                self._remove(token)
+            metrics.set_gauge("auth_cache.size", len(self._entries))
+
+
+auth_cache = AuthCache(max_entries=AUTH_CACHE_MAX_ENTRIES, ttl_seconds=AUTH_CACHE_TTL_SECONDS)
+
+
+# ORM changes to a user (email / password changed, user deleted) drop its cached tokens
+# (bulk update() / delete() statements bypass these events)
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target: User):
+    auth_cache.invalidate_user(target.id)
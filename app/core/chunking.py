@@ -0,0 +1,97 @@
+import hashlib
+from typing import Iterable, Iterator
+
+# Content-defined chunking (CDC)
+# a boundary is placed where a rolling (gear) hash of the last 64 characters matches a mask,
+# so boundaries depend on the local text only: editing one paragraph moves at most the
+# boundaries around it and every other chunk keeps the same text (and hash / embedding).
+# cuts are snapped back to the nearest newline / whitespace to avoid splitting words.
+
+MIN_CHUNK_CHARS = 500
+AVG_CHUNK_CHARS = 1000
+MAX_CHUNK_CHARS = 1500
+# how far a cut may move back to land on a newline / space
+SNAP_CHARS = 200
+
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+# gear hash: bit k depends on the last k+1 characters, so the top bits see the last 64 characters
+_WINDOW = _HASH_BITS
+
+# normalized chunking (FastCDC): harder to cut before the average size, easier after it
+_MASK_HARD = ((1 << 11) - 1) << (_HASH_BITS - 11)
+_MASK_EASY = ((1 << 7) - 1) << (_HASH_BITS - 7)
+
+# 256 fixed pseudo-random 64-bit values (same on every run / process)
+_GEAR = [
+    int.from_bytes(hashlib.sha256(f"gear-{i}".encode()).digest()[:8], "big")
+    for i in range(256)
+]
+
+
+def chunk_hash(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+def _snap(text: str, start: int, cut: int) -> int:
+    """
+    move cut back to just after a newline (or else whitespace) within SNAP_CHARS
+    """
+    floor = max(start + MIN_CHUNK_CHARS // 2, cut - SNAP_CHARS)
+    newline = text.rfind("\n", floor, cut)
+    if newline != -1:
+        return newline + 1
+    for position in range(cut - 1, floor - 1, -1):
+        if text[position].isspace():
+            return position + 1
+    return cut
+
+
+def _find_cut(text: str, start: int, final: bool) -> int | None:
+    """
+    end of the chunk starting at start
+    None when more text is needed to decide (only if not final)
+    """
+    end = len(text)
+    if end - start <= MIN_CHUNK_CHARS:
+        return end if final else None
+
+    fingerprint = 0
+    limit = min(end, start + MAX_CHUNK_CHARS)
+    for position in range(start + MIN_CHUNK_CHARS - _WINDOW, limit):
+        fingerprint = ((fingerprint << 1) + _GEAR[ord(text[position]) & 0xFF]) & _HASH_MASK
+        size = position - start + 1
+        if size < MIN_CHUNK_CHARS:
+            continue
+        mask = _MASK_HARD if size < AVG_CHUNK_CHARS else _MASK_EASY
+        if not fingerprint & mask:
+            return _snap(text, start, position + 1)
+
+    if limit - start >= MAX_CHUNK_CHARS:
+        return _snap(text, start, limit)
+    return end if final else None
+
+
+def iter_chunks(pieces: Iterable[str]) -> Iterator[str]:
+    """
+    content-defined chunks of a stream of text pieces
+    chunks only depend on the concatenated text ("".join(chunks) == "".join(pieces)),
+    so the same text always gives the same chunks however it was read
+    """
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        start = 0
+        while len(buffer) - start >= MAX_CHUNK_CHARS:
+            cut = _find_cut(buffer, start, final=False)
+            if cut is None:
+                break
+            yield buffer[start:cut]
+            start = cut
+        buffer = buffer[start:]
+
+    start = 0
+    while start < len(buffer):
+        cut = _find_cut(buffer, start, final=True)
+        yield buffer[start:cut]
+        start = cut
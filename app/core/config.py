@@ -1,5 +1,111 @@
 import os
+from dotenv import load_dotenv
+
+load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+
+# Background ingestion (upload -> parse -> chunk -> embed -> index)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+# a job whose worker has not sent a heartbeat for this long is taken over by another replica / process
+INGEST_LEASE_SECONDS = float(os.getenv("INGEST_LEASE_SECONDS", "120"))
+# uploaded files; with several API replicas this must be a volume shared by all of them
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+
+# Embedding client: chunks per request, parallel requests, persistent cache file
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "./embedding_cache.sqlite3")
+
+# Semantic answer cache for document chat
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")) # cosine similarity
+
+# Map-reduce summarization
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4")) # parallel LLM calls
+SUMMARY_REDUCE_MAX_CHARS = int(os.getenv("SUMMARY_REDUCE_MAX_CHARS", "6000")) # input size of one reduce call
+
+# PDF extraction: every PDF in worker processes with a per-page timeout, page-parallel for large files
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+PDF_PAGE_TIMEOUT_SECONDS = float(os.getenv("PDF_PAGE_TIMEOUT_SECONDS", "30"))
+
+# Uploads: streamed to disk as the request body arrives, rejected past the max size
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Corpus-wide chat: BM25 is searched per document, so only for corpora up to this many documents
+CORPUS_KEYWORD_MAX_DOCS = int(os.getenv("CORPUS_KEYWORD_MAX_DOCS", "50"))
+
+# Chat prompt: retrieved chunks are packed up to this many (estimated) tokens
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
+# Vector store backend: "chroma" (local ./chroma_db), "pgvector" (document_vectors table in Postgres,
+# shared by every API replica) or "quantized" (compact local index, see below)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "768")) # nomic-embed-text
+PGVECTOR_EF_SEARCH = int(os.getenv("PGVECTOR_EF_SEARCH", "100")) # HNSW candidate list size per query
+
+# VECTOR_BACKEND=quantized: int8 / binary codes in RAM, float32 vectors memory-mapped for re-ranking
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "int8") # "int8" or "binary"
+QUANTIZED_RERANK_FACTOR = int(os.getenv("QUANTIZED_RERANK_FACTOR", "8")) # re-ranked candidates = k * factor
+
+# Re-ranking: over-fetch RERANK_CANDIDATES chunks, keep the best k by a local cross-encoder (CPU)
+# empty RERANK_MODEL: off (needs sentence-transformers), ex: "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "30"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "4096")) # cached (question, chunk) scores
+
+# LLM gateway: concurrent generations sent to the LLM server, calls allowed to wait for a slot
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "2"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32")) # more waiting calls -> 429 with Retry-After
+
+# LLM / embedding servers: comma separated base URLs, each request goes to the least busy healthy one
+# LLM_LOCATION: "local" (OpenAI-compatible Ollama API) or "remote" (OpenAI)
+LLM_LOCATION = os.getenv("LLM_LOCATION", "local")
+LLM_MODEL = os.getenv("LLM_MODEL", "qwen3:14b" if LLM_LOCATION == "local" else "gpt-4o-mini")
+LLM_ENDPOINTS = [
+    url.strip() for url in os.getenv(
+        "LLM_ENDPOINTS", "http://localhost:11434/v1" if LLM_LOCATION == "local" else "https://api.openai.com/v1"
+    ).split(",") if url.strip()
+]
+LLM_API_KEY = os.getenv("LLM_API_KEY") or (
+    "ollama" if LLM_LOCATION == "local" else os.getenv("OPENAI_API_KEY", "sk-proj-...")
+)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "300")) # then the call fails over
+EMBEDDING_ENDPOINTS = [
+    url.strip() for url in os.getenv("EMBEDDING_ENDPOINTS", "http://localhost:11434").split(",") if url.strip()
+]
+EMBED_TIMEOUT_SECONDS = float(os.getenv("EMBED_TIMEOUT_SECONDS", "60"))
+ENDPOINT_PROBE_INTERVAL_SECONDS = float(os.getenv("ENDPOINT_PROBE_INTERVAL_SECONDS", "15"))
+
+# Auth: decoded token -> user principal cache (per process, dropped when the user row changes)
+# AUTH_STATELESS=true trusts the signed token claims (sub + email) and never reads the users table
+# (a deleted user's token then stays valid until it expires)
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "false").lower() in ("1", "true", "yes")
+
+# Passwords: bcrypt runs in its own process pool, never on the request threadpool
+# BCRYPT_ROUNDS: cost of new hashes (a login with a hash of another cost re-hashes the password)
+# PASSWORD_MAX_PENDING: hashes queued for the pool at most, more -> 429
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", "64"))
+
+# Login throttling (sliding window): attempts per client IP, failed attempts per email
+LOGIN_WINDOW_SECONDS = float(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "30"))
+LOGIN_MAX_FAILURES_PER_EMAIL = int(os.getenv("LOGIN_MAX_FAILURES_PER_EMAIL", "5"))
+
+# Database connection pools (applied to the sync and the async engine, each has its own pool)
+# PRE_PING: test a connection before handing it out (drops ones closed by Postgres / a proxy)
+# RECYCLE: replace connections older than this many seconds (-1: never)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30")) # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
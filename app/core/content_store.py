@@ -0,0 +1,157 @@
+import zlib
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.document import Document
+from app.models.document_content import DocumentContent
+
+# Extracted text of a document, stored outside the documents row
+# - split into CONTENT_SEGMENT_CHARS character segments, each zlib-compressed
+# - a range read (chat fallback, preview) only fetches and inflates the segments it overlaps
+# - documents saved before this store keep their text in documents.content (deferred column):
+#   reads fall back to it, `python -m app.cli migrate-content` moves it over
+
+CONTENT_SEGMENT_CHARS = 64 * 1024
+COMPRESSION_LEVEL = 6
+
+
+def _segment_row(doc_id: int, segment: int, start: int, piece: str) -> dict:
+    return {
+        "document_id": doc_id,
+        "segment": segment,
+        "start": start,
+        "length": len(piece),
+        "data": zlib.compress(piece.encode("utf-8"), COMPRESSION_LEVEL),
+    }
+
+
+def encode_segments(doc_id: int, text: str) -> list[dict]:
+    """
+    rows for document_contents (CPU bound: call from a worker thread for large texts)
+    """
+    return [
+        _segment_row(doc_id, segment, start, text[start:start + CONTENT_SEGMENT_CHARS])
+        for segment, start in enumerate(range(0, len(text), CONTENT_SEGMENT_CHARS))
+    ]
+
+
+def _decode(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+
+def _slice(rows, start: int, end: int | None) -> str:
+    """
+    rows: (segment start, data) overlapping [start, end), in order
+    """
+    parts = []
+    for segment_start, data in rows:
+        text = _decode(data)
+        lo = max(0, start - segment_start)
+        hi = len(text) if end is None else max(0, end - segment_start)
+        parts.append(text[lo:hi])
+    return "".join(parts)
+
+
+def _range_query(doc_id: int, start: int, end: int | None):
+    query = (
+        select(DocumentContent.start, DocumentContent.data)
+        .where(
+            DocumentContent.document_id == doc_id,
+            DocumentContent.start + DocumentContent.length > start,
+        )
+        .order_by(DocumentContent.segment)
+    )
+    if end is not None:
+        query = query.where(DocumentContent.start < end)
+    return query
+
+
+def _has_segments_query(doc_id: int):
+    return select(DocumentContent.segment).where(DocumentContent.document_id == doc_id).limit(1)
+
+
+def _legacy_query(doc_id: int):
+    return select(Document.content).where(Document.id == doc_id)
+
+
+def _replace_statements(doc_id: int, rows: list[dict]):
+    statements = [delete(DocumentContent).where(DocumentContent.document_id == doc_id)]
+    if rows:
+        statements.append(insert(DocumentContent).values(rows))
+    # the legacy column is cleared so it is never read again
+    statements.append(update(Document).where(Document.id == doc_id).values(content=None))
+    return statements
+
+
+# 1. sync (ingest worker threads, CLI); the caller commits
+class ContentWriter:
+    """
+    replace a document's text with text appended piece by piece (ex: parsed pages as they arrive):
+    every full segment is inserted right away, only the current one is kept in memory
+    """
+
+    def __init__(self, db: Session, doc_id: int):
+        self.db = db
+        self.doc_id = doc_id
+        self._buffer: list[str] = []
+        self._size = 0
+        self._segment = 0
+        self._start = 0
+        db.execute(delete(DocumentContent).where(DocumentContent.document_id == doc_id))
+
+    def _flush(self, limit: int):
+        text = "".join(self._buffer)
+        piece, rest = text[:limit], text[limit:]
+        self.db.execute(insert(DocumentContent).values([_segment_row(self.doc_id, self._segment, self._start, piece)]))
+        self._segment += 1
+        self._start += len(piece)
+        self._buffer = [rest] if rest else []
+        self._size = len(rest)
+
+    def write(self, text: str):
+        self._buffer.append(text)
+        self._size += len(text)
+        while self._size >= CONTENT_SEGMENT_CHARS:
+            self._flush(CONTENT_SEGMENT_CHARS)
+
+    def close(self):
+        if self._size:
+            self._flush(self._size)
+        # the legacy column is cleared so it is never read again
+        self.db.execute(update(Document).where(Document.id == self.doc_id).values(content=None))
+
+
+def save_content(db: Session, doc_id: int, text: str):
+    writer = ContentWriter(db, doc_id)
+    writer.write(text)
+    writer.close()
+
+
+def load_content(db: Session, doc_id: int, start: int = 0, end: int | None = None) -> str:
+    rows = db.execute(_range_query(doc_id, start, end)).all()
+    if rows or db.execute(_has_segments_query(doc_id)).first() is not None:
+        return _slice(rows, start, end)
+    return (db.execute(_legacy_query(doc_id)).scalar() or "")[start:end]
+
+
+# 2. async (API routes); the caller commits
+async def save_content_async(db: AsyncSession, doc_id: int, text: str):
+    rows = await run_in_threadpool(encode_segments, doc_id, text)
+    for statement in _replace_statements(doc_id, rows):
+        await db.execute(statement)
+
+
+async def read_content(db: AsyncSession, doc_id: int, start: int = 0, end: int | None = None) -> str:
+    """
+    characters [start, end) of a document's text ("" if it has none)
+    """
+    rows = (await db.execute(_range_query(doc_id, start, end))).all()
+    if rows or (await db.execute(_has_segments_query(doc_id))).first() is not None:
+        if end is not None and end - start <= CONTENT_SEGMENT_CHARS:
+            return _slice(rows, start, end) # one or two segments: not worth a thread hop
+        return await run_in_threadpool(_slice, rows, start, end)
+    return ((await db.execute(_legacy_query(doc_id))).scalar() or "")[start:end]
+
@@ -0,0 +1,94 @@
+import math
+import re
+
+from app.core.config import CONTEXT_TOKEN_BUDGET
+
+# Token-budget-aware context assembly for chat prompts
+# prefill time of the local model grows with prompt size, so retrieved chunks are
+# deduplicated (overlapping neighbours, repeated text) and packed up to a fixed budget
+
+_CJK = re.compile(r"[ᄀ-ᇿ぀-ヿ㄰-㆏㐀-鿿가-힯]")
+
+# shortest shared prefix/suffix treated as chunk overlap (shorter matches are coincidence)
+MIN_OVERLAP_CHARS = 40
+# longest overlap searched for (chunks indexed with the old splitter overlap by 200 chars)
+MAX_OVERLAP_CHARS = 400
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    rough token count without a tokenizer:
+    Korean/CJK characters ~1 token each, other characters ~4 per token
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    longest prefix of text that fits in max_tokens (estimated)
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low]
+
+
+def _overlap(left: str, right: str) -> int:
+    """
+    length of the longest suffix of left that is a prefix of right
+    """
+    longest = min(len(left), len(right), MAX_OVERLAP_CHARS)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def dedupe_contexts(contexts: list[str]) -> list[str]:
+    """
+    keep rank order; drop exact duplicates and chunks contained in a higher-ranked one,
+    and cut text a lower-ranked chunk shares with a neighbouring chunk already kept
+    """
+    kept: list[str] = []
+    for context in contexts:
+        context = context.strip()
+        if not context or any(context in other for other in kept):
+            continue
+        for other in kept:
+            head = _overlap(other, context) # other ... | overlap | ... context
+            if head:
+                context = context[head:].lstrip()
+            tail = _overlap(context, other) # context ... | overlap | ... other
+            if tail:
+                context = context[:-tail].rstrip()
+        if context:
+            kept.append(context)
+    return kept
+
+
+def pack_contexts(contexts: list[str], budget: int = CONTEXT_TOKEN_BUDGET) -> list[str]:
+    """
+    deduplicated contexts in rank order, as many as fit in budget tokens
+    (a lower-ranked chunk that fits is still taken after a bigger one did not;
+    the top chunk is truncated if it alone is over budget)
+    """
+    packed = []
+    used = 0
+    for context in dedupe_contexts(contexts):
+        tokens = estimate_tokens(context)
+        if used + tokens <= budget:
+            packed.append(context)
+            used += tokens
+        elif not packed:
+            packed.append(truncate_to_tokens(context, budget))
+            used = budget
+    return packed
@@ -0,0 +1,150 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from langchain_core.embeddings import Embeddings
+
+from app.core import metrics
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    persistent (model, sha256(text)) -> vector cache in a local SQLite file
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache ("
+                " model TEXT NOT NULL,"
+                " hash TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " PRIMARY KEY (model, hash))"
+            )
+            self._conn.commit()
+
+    def get_many(self, model: str, hashes: list[str]) -> dict[str, list[float]]:
+        found = {}
+        # stay below SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            part = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embedding_cache WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *part],
+                ).fetchall()
+            for key, blob in rows:
+                found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, model: str, items: dict[str, list[float]]):
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (model, hash, vector) VALUES (?, ?, ?)",
+                [(model, key, array("f", vector).tobytes()) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    wraps an embedding model (ex: OllamaEmbeddings)
+    - duplicate text is looked up in the cache instead of being embedded again
+    - cache misses are sent in batches of batch_size, up to `concurrency` batches at a time
+    """
+
+    def __init__(self, base: Embeddings, model: str, cache: EmbeddingCache,
+                 batch_size: int = 32, concurrency: int = 4):
+        self.base = base
+        self.model = model
+        self.cache = cache
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="embed")
+
+    def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        started = time.perf_counter()
+        vectors = self.base.embed_documents(batch)
+        metrics.observe("embedding.batch", time.perf_counter() - started)
+        metrics.incr("embedding.requests")
+        return vectors
+
+    def embed_many(self, texts: list[str], on_progress=None) -> list[list[float]]:
+        """
+        embed texts in order; on_progress(done, total) is called as batches finish
+        """
+        total = len(texts)
+        if not total:
+            return []
+
+        hashes = [content_hash(text) for text in texts]
+        vectors = self.cache.get_many(self.model, list(set(hashes)))
+        metrics.incr("embedding.cache_hit", sum(1 for h in hashes if h in vectors))
+
+        # unique texts that still have to be embedded
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        metrics.incr("embedding.cache_miss", len(missing))
+
+        done = total - sum(1 for h in hashes if h in missing)
+        if on_progress:
+            on_progress(done, total)
+
+        keys = list(missing)
+        batches = [keys[start:start + self.batch_size] for start in range(0, len(keys), self.batch_size)]
+        futures = {
+            self._executor.submit(self._embed_batch, [missing[key] for key in batch]): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            new_vectors = dict(zip(batch, future.result()))
+            self.cache.put_many(self.model, new_vectors)
+            vectors.update(new_vectors)
+
+            batch_keys = set(batch)
+            done += sum(1 for h in hashes if h in batch_keys)
+            if on_progress:
+                on_progress(done, total)
+
+        return [vectors[key] for key in hashes]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_many(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        """
+        one search query, on the caller's thread: never queued behind an ingest's batches in the executor.
+        the cache is read (a chunk with the same text) but not written (questions would grow it forever)
+        """
+        key = content_hash(text)
+        cached = self.cache.get_many(self.model, [key]).get(key)
+        if cached is not None:
+            metrics.incr("embedding.query_cache_hit")
+            return cached
+        started = time.perf_counter()
+        vector = self.base.embed_query(text)
+        metrics.observe("embedding.query", time.perf_counter() - started)
+        metrics.incr("embedding.requests")
+        return vector
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
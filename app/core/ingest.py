@@ -0,0 +1,357 @@
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+
+from app.core import metrics
+from app.core.answer_cache import answer_cache
+from app.core.chunking import chunk_hash
+from app.core.config import INGEST_WORKERS, INGEST_LEASE_SECONDS
+from app.core.content_store import ContentWriter, load_content
+from app.core.parser import iter_file_pages
+from app.core.vector_store import (
+    split_stream,
+    split_text,
+    embed_chunks,
+    index_chunks,
+    plan_chunk_update,
+    chunk_ids,
+    delete_document_from_vectorstore,
+)
+from app.db.session import SessionLocal
+from app.models.document import Document
+from app.models.document_chunk import DocumentChunk
+from app.models.ingest_job import (
+    IngestJob,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_KIND_UPLOAD,
+)
+
+# overall progress range of each stage (start, end)
+# (parse and chunk run together: pages are chunked as they come out of the parser)
+STAGE_PROGRESS = {
+    "parse": (0.0, 0.15),
+    "chunk": (0.15, 0.2),
+    "embed": (0.2, 0.9),
+    "index": (0.9, 1.0),
+}
+
+# Jobs are leased, so several API replicas (or processes) can share the ingest_jobs table:
+# - a worker claims a queued job (claimed_by = this process, heartbeat_at = now)
+# - a maintenance thread refreshes the heartbeat of the jobs owned here (queued in this process's
+#   executor or running) every INGEST_LEASE_SECONDS / 3 and re-queues jobs whose lease went stale
+#   (their process died) to run them here
+# - on shutdown this process releases its jobs so the next one picks them up at once
+# the uploaded file must be readable by every replica (shared UPLOAD_DIR)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+# jobs submitted to this process's executor and not finished yet (queued or running here)
+_local_jobs: set[int] = set()
+_local_lock = threading.Lock()
+_maintenance_thread: threading.Thread | None = None
+_maintenance_stop = threading.Event()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+        return _executor
+
+
+def create_ingest_job(db, doc_id: int, kind: str = JOB_KIND_UPLOAD) -> IngestJob:
+    """
+    add a queued job for the document (caller commits, then calls submit_ingest_job)
+    """
+    job = IngestJob(
+        document_id=doc_id,
+        kind=kind,
+        status=JOB_QUEUED,
+        progress=0.0,
+        claimed_by=WORKER_ID, # submitted here: other processes leave it alone while the lease is fresh
+        heartbeat_at=datetime.utcnow(),
+    )
+    db.add(job)
+    return job
+
+
+def submit_ingest_job(job_id: int):
+    """
+    hand the job over to the worker pool (its lease is kept fresh while it waits for a worker)
+    """
+    with _local_lock:
+        _local_jobs.add(job_id)
+    _get_executor().submit(run_ingest_job, job_id)
+
+
+def _update_job(job_id: int, **fields):
+    # short-lived session per update, so progress is visible to the status API right away
+    db = SessionLocal()
+    try:
+        db.query(IngestJob).filter(IngestJob.id == job_id).update(fields)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _enter_stage(job_id: int, stage: str):
+    _update_job(job_id, stage=stage, progress=STAGE_PROGRESS[stage][0])
+
+
+def _claim_job(job_id: int) -> bool:
+    """
+    queued -> running, only one worker (of any process) can win
+    """
+    db = SessionLocal()
+    try:
+        claimed = (
+            db.query(IngestJob)
+            .filter(IngestJob.id == job_id, IngestJob.status == JOB_QUEUED)
+            .update({
+                "status": JOB_RUNNING,
+                "attempts": IngestJob.attempts + 1,
+                "error": None,
+                "claimed_by": WORKER_ID,
+                "heartbeat_at": datetime.utcnow(),
+            })
+        )
+        db.commit()
+    finally:
+        db.close()
+    return claimed == 1
+
+
+def _indexed_chunk_ids(db, doc_id: int) -> set[str] | None:
+    """
+    vector IDs recorded in document_chunks (None: nothing recorded, ask the vector store)
+    """
+    rows = db.query(DocumentChunk.vector_id).filter(DocumentChunk.document_id == doc_id).all()
+    if not rows:
+        return None
+    return {vector_id for (vector_id,) in rows}
+
+
+def _save_document_chunks(db, doc_id: int, chunks: list[str]):
+    """
+    replace the chunk rows of a document with the chunks just indexed
+    """
+    db.query(DocumentChunk).filter(DocumentChunk.document_id == doc_id).delete(synchronize_session=False)
+    db.add_all([
+        DocumentChunk(
+            document_id=doc_id,
+            position=position,
+            content_hash=chunk_hash(chunk),
+            vector_id=vector_id,
+            length=len(chunk),
+        )
+        for position, (chunk, vector_id) in enumerate(zip(chunks, chunk_ids(doc_id, chunks)))
+    ])
+    db.commit()
+
+
+def run_ingest_job(job_id: int):
+    """
+    parse -> chunk -> embed -> index for one job
+    (reindex jobs skip parse and chunk the stored content)
+    only chunks not yet in vector DB are embedded, so a resumed job or an edit is cheap
+    """
+    if not _claim_job(job_id):
+        # already done, or taken over by another process
+        with _local_lock:
+            _local_jobs.discard(job_id)
+        return
+
+    db = SessionLocal()
+    try:
+        job = db.query(IngestJob).filter(IngestJob.id == job_id).first()
+        doc = db.query(Document).filter(Document.id == job.document_id).first() if job else None
+        if doc is None:
+            # document was deleted while the job was waiting
+            return
+        doc_id = doc.id
+
+        # 1. parse (+ chunk): pages are streamed from the parser straight into the chunker
+        _enter_stage(job_id, "parse")
+        if job.kind == JOB_KIND_UPLOAD and doc.file_path:
+            # the text goes to the content store a segment at a time, never held whole in memory
+            content = ContentWriter(db, doc_id)
+
+            def page_stream():
+                parse_start, parse_end = STAGE_PROGRESS["parse"]
+                for page in iter_file_pages(doc.file_path):
+                    content.write(page.text)
+                    done = page.index + 1
+                    if page.total and (done % 10 == 0 or done == page.total):
+                        _update_job(job_id, progress=parse_start + (parse_end - parse_start) * done / page.total)
+                    yield page.text
+
+            chunks = list(split_stream(page_stream()))
+            content.close()
+            db.commit()
+            _enter_stage(job_id, "chunk")
+        else:
+            # 2. chunk (edited / text-only document, nothing to parse)
+            _enter_stage(job_id, "chunk")
+            chunks = split_text(load_content(db, doc_id))
+        # chunk hashes vs document_chunks: only new / changed chunks need embedding
+        indexed_ids = _indexed_chunk_ids(db, doc_id)
+        new_positions = plan_chunk_update(doc_id, chunks, indexed_ids=indexed_ids)
+        metrics.incr("ingest.chunks_embedded", len(new_positions))
+        metrics.incr("ingest.chunks_reused", len(chunks) - len(new_positions))
+
+        # 3. embed (new or changed chunks only)
+        _enter_stage(job_id, "embed")
+        start, end = STAGE_PROGRESS["embed"]
+
+        def on_progress(done: int, total: int):
+            _update_job(job_id, progress=start + (end - start) * done / total)
+
+        vectors = embed_chunks([chunks[position] for position in new_positions], on_progress=on_progress)
+
+        # 4. index
+        _enter_stage(job_id, "index")
+        index_chunks(
+            doc_id, chunks, dict(zip(new_positions, vectors)), owner_id=doc.owner_id, indexed_ids=indexed_ids
+        )
+        _save_document_chunks(db, doc_id, chunks)
+        # cached answers were based on the old chunks
+        answer_cache.invalidate(doc_id)
+
+        db.expire_all()
+        if db.query(Document.id).filter(Document.id == doc_id).first() is None:
+            # document was deleted while it was being indexed
+            delete_document_from_vectorstore(doc_id)
+            return
+
+        _update_job(job_id, status=JOB_DONE, stage=None, progress=1.0)
+        print(f"Document {doc_id} ingested with {len(chunks)} chunks (job {job_id}).")
+
+    except Exception as e:
+        db.rollback()
+        print(f"Ingest Error (job {job_id}): {e}")
+        _update_job(job_id, status=JOB_FAILED, error=str(e))
+    finally:
+        db.close()
+        with _local_lock:
+            _local_jobs.discard(job_id)
+
+
+def _send_heartbeats():
+    """
+    jobs waiting in the executor get heartbeats too: otherwise a backlog longer than the lease
+    would look stale and be taken over while this process still intends to run it
+    """
+    with _local_lock:
+        job_ids = list(_local_jobs)
+    if not job_ids:
+        return
+    db = SessionLocal()
+    try:
+        db.query(IngestJob).filter(
+            IngestJob.id.in_(job_ids),
+            IngestJob.status.in_([JOB_QUEUED, JOB_RUNNING]),
+            IngestJob.claimed_by == WORKER_ID,
+        ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _take_over_stale_jobs(limit: int | None) -> list[int]:
+    """
+    queued / running jobs whose lease is stale (or released) are re-queued under this process
+    SKIP LOCKED: processes sweeping at the same time take different jobs instead of waiting
+    """
+    stale = datetime.utcnow() - timedelta(seconds=INGEST_LEASE_SECONDS)
+    with _local_lock:
+        local_ids = list(_local_jobs)
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(IngestJob.id)
+            .filter(
+                IngestJob.status.in_([JOB_QUEUED, JOB_RUNNING]),
+                or_(IngestJob.heartbeat_at.is_(None), IngestJob.heartbeat_at < stale),
+                # never submit a job twice to this process's executor
+                IngestJob.id.notin_(local_ids),
+            )
+            .order_by(IngestJob.id)
+            .with_for_update(skip_locked=True)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        job_ids = [job_id for (job_id,) in query]
+        if job_ids:
+            db.query(IngestJob).filter(IngestJob.id.in_(job_ids)).update(
+                {"status": JOB_QUEUED, "claimed_by": WORKER_ID, "heartbeat_at": datetime.utcnow()},
+                synchronize_session=False,
+            )
+        db.commit()
+    finally:
+        db.close()
+
+    for job_id in job_ids:
+        submit_ingest_job(job_id)
+    return job_ids
+
+
+def _maintenance_loop():
+    while not _maintenance_stop.wait(INGEST_LEASE_SECONDS / 3):
+        try:
+            _send_heartbeats()
+            job_ids = _take_over_stale_jobs(limit=INGEST_WORKERS * 2)
+            if job_ids:
+                print(f"Took over {len(job_ids)} stale ingest jobs: {job_ids}")
+        except Exception as e:
+            print(f"Ingest Error (lease maintenance): {e}")
+
+
+def resume_ingest_jobs():
+    """
+    called on startup: jobs released by a stopped process or whose worker stopped sending
+    heartbeats are queued again here; jobs still leased by a live replica are left alone
+    """
+    global _maintenance_thread
+
+    job_ids = _take_over_stale_jobs(limit=None)
+    if job_ids:
+        print(f"Resumed {len(job_ids)} ingest jobs.")
+
+    if _maintenance_thread is None:
+        _maintenance_stop.clear()
+        _maintenance_thread = threading.Thread(target=_maintenance_loop, name="ingest-lease", daemon=True)
+        _maintenance_thread.start()
+
+
+def shutdown_ingest_workers():
+    """
+    called on shutdown: this process's unfinished jobs are released (no lease), so the next
+    process / another replica resumes them without waiting for the lease to expire
+    """
+    global _executor, _maintenance_thread
+    _maintenance_stop.set()
+    _maintenance_thread = None
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+    db = SessionLocal()
+    try:
+        released = db.query(IngestJob).filter(
+            IngestJob.claimed_by == WORKER_ID, IngestJob.status.in_([JOB_QUEUED, JOB_RUNNING])
+        ).update({"status": JOB_QUEUED, "claimed_by": None, "heartbeat_at": None}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    if released:
+        print(f"Released {released} unfinished ingest jobs.")
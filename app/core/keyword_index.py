@@ -0,0 +1,143 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+# Per-document BM25 keyword index, stored next to the Chroma data
+# exact terms (product codes, names) that are weak in embedding space are found here
+KEYWORD_INDEX_DIRECTORY = "./keyword_index"
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# loaded indexes kept in memory
+INDEX_CACHE_SIZE = 64
+
+# latin/number tokens keep '-', '_' and '.' inside (ex: "AB-1200", "v2.1")
+_WORD = re.compile(r"[0-9a-z]+(?:[-_.][0-9a-z]+)*|[가-힣]+")
+_HANGUL = re.compile(r"[가-힣]+")
+
+_cache: OrderedDict[int, dict | None] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    lowercase word tokens
+    - codes like "AB-1200" are kept whole and also split into parts
+    - Korean words also emit character bigrams, so a word followed by a particle (조사) still matches
+    """
+    tokens = []
+    for word in _WORD.findall(text.lower()):
+        tokens.append(word)
+        if _HANGUL.fullmatch(word):
+            if len(word) > 2:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        elif not word.isalnum():
+            tokens.extend(part for part in re.split(r"[-_.]", word) if part)
+    return tokens
+
+
+def _index_path(doc_id: int) -> str:
+    return os.path.join(KEYWORD_INDEX_DIRECTORY, f"{doc_id}.json")
+
+
+def build_keyword_index(doc_id: int, chunks: list[str]):
+    """
+    build (or replace) the BM25 index of a document from its chunks
+    """
+    postings: dict[str, list[list[int]]] = {}
+    lengths = []
+    for position, chunk in enumerate(chunks):
+        counts = Counter(tokenize(chunk))
+        lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append([position, tf])
+
+    index = {"chunks": chunks, "lengths": lengths, "postings": postings}
+
+    os.makedirs(KEYWORD_INDEX_DIRECTORY, exist_ok=True)
+    path = _index_path(doc_id)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, path) # atomic: readers never see a half written index
+
+    with _cache_lock:
+        _cache.pop(doc_id, None)
+
+
+def list_keyword_index_doc_ids() -> set[int]:
+    """
+    doc_ids that have a keyword index file (for garbage collection)
+    """
+    if not os.path.isdir(KEYWORD_INDEX_DIRECTORY):
+        return set()
+    return {
+        int(name[:-len(".json")]) for name in os.listdir(KEYWORD_INDEX_DIRECTORY)
+        if name.endswith(".json") and name[:-len(".json")].isdigit()
+    }
+
+
+def delete_keyword_index(doc_id: int):
+    try:
+        os.remove(_index_path(doc_id))
+    except FileNotFoundError:
+        pass
+    with _cache_lock:
+        _cache.pop(doc_id, None)
+
+
+def _load_index(doc_id: int) -> dict | None:
+    with _cache_lock:
+        if doc_id in _cache:
+            _cache.move_to_end(doc_id)
+            return _cache[doc_id]
+
+    try:
+        with open(_index_path(doc_id), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        index = None # document indexed before keyword search existed
+
+    with _cache_lock:
+        _cache[doc_id] = index
+        while len(_cache) > INDEX_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
+
+
+def search_keyword_index(doc_id: int, query: str, k: int = 4) -> list[str]:
+    """
+    top-k chunks of a document by BM25 score
+    """
+    return [chunk for _, chunk in search_keyword_index_scored(doc_id, query, k)]
+
+
+def search_keyword_index_scored(doc_id: int, query: str, k: int = 4) -> list[tuple[float, str]]:
+    """
+    top-k (BM25 score, chunk) of a document
+    """
+    index = _load_index(doc_id)
+    if not index or not index["chunks"]:
+        return []
+
+    lengths = index["lengths"]
+    n_chunks = len(lengths)
+    avg_length = (sum(lengths) / n_chunks) or 1.0
+
+    scores: dict[int, float] = {}
+    for term in set(tokenize(query)):
+        postings = index["postings"].get(term)
+        if not postings:
+            continue
+        idf = math.log(1 + (n_chunks - len(postings) + 0.5) / (len(postings) + 0.5))
+        for position, tf in postings:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[position] / avg_length)
+            scores[position] = scores.get(position, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [(scores[position], index["chunks"][position]) for position in best]
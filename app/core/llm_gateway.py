@@ -0,0 +1,130 @@
+import asyncio
+import heapq
+import math
+import time
+from contextlib import asynccontextmanager
+from itertools import count
+
+from app.core import metrics
+from app.core.config import LLM_MAX_IN_FLIGHT, LLM_MAX_QUEUE
+
+# Gateway in front of the LLM server (a single Ollama instance handles only a few generations at once)
+# - at most max_in_flight calls run at the same time, the rest wait in a priority queue
+#   (interactive chat before batch summarization, FIFO within a priority)
+# - identical in-flight non-streaming prompts share one call
+# - when max_queue calls are already waiting, new calls fail fast with LLMQueueFull (-> 429 + Retry-After)
+#   instead of every caller timing out together
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+
+class LLMQueueFull(Exception):
+    """
+    too many LLM calls waiting; retry_after is a hint in seconds
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"LLM queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class LLMGateway:
+    """
+    one per process (module singleton below), used from the event loop only
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self._in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = [] # heap of (priority, seq, future)
+        self._seq = count()
+        self._coalesced: dict[str, asyncio.Task] = {}
+        self._avg_hold_seconds = 10.0 # moving average of a call's duration (Retry-After estimate)
+
+    def _queue_depth(self) -> int:
+        return sum(1 for _, _, waiter in self._waiters if not waiter.done())
+
+    def _update_gauges(self):
+        metrics.set_gauge("llm.in_flight", self._in_flight)
+        metrics.set_gauge("llm.queue_depth", self._queue_depth())
+
+    def retry_after(self) -> int:
+        """
+        seconds until the queue ahead of a new call has roughly drained
+        """
+        rounds = (self._queue_depth() + 1) / max(1, self.max_in_flight)
+        return max(1, math.ceil(rounds * self._avg_hold_seconds))
+
+    async def _acquire(self, priority: int):
+        if self._in_flight < self.max_in_flight and not self._queue_depth():
+            self._in_flight += 1
+            self._update_gauges()
+            return
+
+        if self._queue_depth() >= self.max_queue:
+            metrics.incr("llm.rejected")
+            raise LLMQueueFull(self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), waiter))
+        self._update_gauges()
+        started = time.perf_counter()
+        try:
+            await waiter # resolved by _release: the slot is handed over, _in_flight already counts it
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release() # slot was handed over just before the cancel: pass it on
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            metrics.observe("llm.queue_wait", waited)
+            metrics.observe(f"llm.queue_wait.{PRIORITY_NAMES.get(priority, priority)}", waited)
+            self._update_gauges()
+
+    def _release(self):
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                self._update_gauges()
+                return
+        self._in_flight -= 1
+        self._update_gauges()
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE):
+        """
+        hold one of the max_in_flight slots (ex: for the whole duration of a stream)
+        """
+        await self._acquire(priority)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._avg_hold_seconds = 0.8 * self._avg_hold_seconds + 0.2 * (time.perf_counter() - started)
+            self._release()
+
+    async def run(self, key: str, call, priority: int = PRIORITY_INTERACTIVE):
+        """
+        await call() inside a slot; callers with the same key while it runs share the result
+        (key must cover everything that changes the output: model, messages, temperature)
+        """
+        task = self._coalesced.get(key)
+        if task is not None:
+            metrics.incr("llm.coalesced")
+        else:
+            async def guarded():
+                async with self.slot(priority):
+                    return await call()
+
+            task = asyncio.ensure_future(guarded())
+            self._coalesced[key] = task
+            task.add_done_callback(lambda done: self._coalesced.pop(key) if self._coalesced.get(key) is done else None)
+        # one caller going away (client disconnect) must not cancel the call for the others
+        return await asyncio.shield(task)
+
+
+gateway = LLMGateway(LLM_MAX_IN_FLIGHT, LLM_MAX_QUEUE)
@@ -0,0 +1,308 @@
+import asyncio
+import threading
+import time
+import urllib.request
+from contextlib import asynccontextmanager
+from itertools import count
+
+import httpx
+import ollama
+import openai
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
+from openai import AsyncOpenAI
+
+from app.core import metrics
+from app.core.config import (
+    LLM_ENDPOINTS,
+    LLM_API_KEY,
+    LLM_TIMEOUT_SECONDS,
+    EMBEDDING_ENDPOINTS,
+    EMBED_TIMEOUT_SECONDS,
+    ENDPOINT_PROBE_INTERVAL_SECONDS,
+)
+
+# Pools of interchangeable LLM / embedding servers
+# - each call goes to the healthy endpoint with the fewest outstanding requests
+# - a call that fails with a connection error, timeout or 5xx is retried on another endpoint
+#   and the failed endpoint is skipped until a health probe (or a later call) succeeds again
+# - per-endpoint latency: <pool>.endpoint.<url> timings, outstanding / healthy gauges in /metrics
+
+PROBE_TIMEOUT_SECONDS = 5.0
+
+
+class Endpoint:
+    def __init__(self, url: str, client):
+        self.url = url
+        self.client = client
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0
+
+
+class EndpointPool:
+    """
+    least-outstanding-requests routing with failover, usable from threads (call_sync)
+    and from the event loop (call / stream)
+    retriable: exception types that mean "this endpoint is down / too slow, try another one"
+    probe(endpoint) -> awaitable bool, run by the health checker
+    """
+
+    def __init__(self, name: str, endpoints: list[Endpoint], retriable: tuple, probe):
+        if not endpoints:
+            raise ValueError(f"{name}: no endpoints configured")
+        self.name = name
+        self.endpoints = endpoints
+        self.retriable = retriable
+        self.probe = probe
+        self._lock = threading.Lock()
+        self._turn = count() # rotates ties between equally busy endpoints
+        _pools.append(self)
+        for endpoint in endpoints:
+            self._update_gauges(endpoint)
+
+    def _update_gauges(self, endpoint: Endpoint):
+        metrics.set_gauge(f"{self.name}.endpoint.{endpoint.url}.outstanding", endpoint.outstanding)
+        metrics.set_gauge(f"{self.name}.endpoint.{endpoint.url}.healthy", int(endpoint.healthy))
+
+    def _acquire(self, tried: list[Endpoint]) -> Endpoint | None:
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in tried]
+            # every endpoint marked down: still try them rather than fail without a request
+            healthy = [endpoint for endpoint in candidates if endpoint.healthy] or candidates
+            if not healthy:
+                return None
+            offset = next(self._turn) % len(healthy)
+            rotated = healthy[offset:] + healthy[:offset]
+            endpoint = min(rotated, key=lambda candidate: candidate.outstanding)
+            endpoint.outstanding += 1
+            self._update_gauges(endpoint)
+            return endpoint
+
+    def _release(self, endpoint: Endpoint, started: float, error: Exception | None = None, finished: bool = True):
+        """
+        always called once per _acquire (try / finally)
+        finished=False: the call was cancelled (timeout, client gone, shutdown), which says nothing about the endpoint
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            if not finished:
+                pass
+            elif error is None:
+                endpoint.healthy = True
+                metrics.observe(f"{self.name}.endpoint.{endpoint.url}", time.perf_counter() - started)
+            else:
+                endpoint.healthy = False
+                endpoint.failures += 1
+                metrics.incr(f"{self.name}.endpoint.{endpoint.url}.failures")
+            self._update_gauges(endpoint)
+        if finished and error is not None:
+            print(f"{self.name} endpoint {endpoint.url} failed: {error!r}")
+
+    def _is_retriable(self, error: Exception) -> bool:
+        return isinstance(error, self.retriable)
+
+    async def call(self, fn):
+        """
+        await fn(client) on the least busy endpoint, failing over to the others
+        """
+        tried: list[Endpoint] = []
+        while True:
+            endpoint = self._acquire(tried)
+            if endpoint is None:
+                raise last_error
+            tried.append(endpoint)
+            started = time.perf_counter()
+            failed, finished = None, False
+            try:
+                result = await fn(endpoint.client)
+                finished = True
+            except Exception as e:
+                finished = True
+                if not self._is_retriable(e):
+                    raise
+                failed = e
+            finally:
+                self._release(endpoint, started, error=failed, finished=finished)
+            if failed is None:
+                return result
+            metrics.incr(f"{self.name}.failover")
+            last_error = failed
+
+    def call_sync(self, fn):
+        """
+        blocking version of call (worker threads)
+        """
+        tried: list[Endpoint] = []
+        while True:
+            endpoint = self._acquire(tried)
+            if endpoint is None:
+                raise last_error
+            tried.append(endpoint)
+            started = time.perf_counter()
+            failed, finished = None, False
+            try:
+                result = fn(endpoint.client)
+                finished = True
+            except Exception as e:
+                finished = True
+                if not self._is_retriable(e):
+                    raise
+                failed = e
+            finally:
+                self._release(endpoint, started, error=failed, finished=finished)
+            if failed is None:
+                return result
+            metrics.incr(f"{self.name}.failover")
+            last_error = failed
+
+    @asynccontextmanager
+    async def stream(self, fn):
+        """
+        open a stream with fn(client) (failover until it is open), the endpoint stays
+        outstanding until the stream is consumed; failures after that are not retried
+        """
+        tried: list[Endpoint] = []
+        while True:
+            endpoint = self._acquire(tried)
+            if endpoint is None:
+                raise last_error
+            tried.append(endpoint)
+            started = time.perf_counter()
+            try:
+                stream = await fn(endpoint.client)
+            except Exception as e:
+                self._release(endpoint, started, error=e if self._is_retriable(e) else None)
+                if not self._is_retriable(e):
+                    raise
+                metrics.incr(f"{self.name}.failover")
+                last_error = e
+                continue
+            except BaseException:
+                self._release(endpoint, started, finished=False)
+                raise
+            break
+
+        error, finished = None, False
+        try:
+            yield stream
+            finished = True
+        except Exception as e:
+            finished = True
+            error = e if self._is_retriable(e) else None
+            raise
+        finally:
+            self._release(endpoint, started, error=error, finished=finished)
+
+    async def probe_all(self):
+        async def check(endpoint: Endpoint):
+            try:
+                healthy = await asyncio.wait_for(self.probe(endpoint), PROBE_TIMEOUT_SECONDS)
+            except Exception:
+                healthy = False
+            with self._lock:
+                if healthy != endpoint.healthy:
+                    print(f"{self.name} endpoint {endpoint.url} is {'up' if healthy else 'down'}.")
+                endpoint.healthy = healthy
+                self._update_gauges(endpoint)
+
+        await asyncio.gather(*(check(endpoint) for endpoint in self.endpoints))
+
+
+_pools: list[EndpointPool] = []
+_health_task: asyncio.Task | None = None
+
+
+async def _health_loop():
+    while True:
+        await asyncio.gather(*(pool.probe_all() for pool in _pools))
+        await asyncio.sleep(ENDPOINT_PROBE_INTERVAL_SECONDS)
+
+
+def start_health_checks():
+    """
+    called on startup: probe every endpoint now and every ENDPOINT_PROBE_INTERVAL_SECONDS
+    """
+    global _health_task
+    if _health_task is None:
+        _health_task = asyncio.get_running_loop().create_task(_health_loop())
+
+
+async def stop_health_checks():
+    global _health_task
+    if _health_task is not None:
+        _health_task.cancel()
+        try:
+            await _health_task
+        except asyncio.CancelledError:
+            pass
+        _health_task = None
+
+
+# 1. LLM: OpenAI-compatible chat completions (Ollama /v1 or OpenAI)
+async def _probe_llm(endpoint: Endpoint) -> bool:
+    await endpoint.client.models.list()
+    return True
+
+
+llm_pool = EndpointPool(
+    "llm",
+    [
+        # retries are done by the pool on another endpoint
+        Endpoint(url, AsyncOpenAI(base_url=url, api_key=LLM_API_KEY, timeout=LLM_TIMEOUT_SECONDS, max_retries=0))
+        for url in LLM_ENDPOINTS
+    ],
+    retriable=(
+        openai.APIConnectionError, # includes APITimeoutError
+        openai.InternalServerError,
+        openai.RateLimitError,
+        asyncio.TimeoutError,
+    ),
+    probe=_probe_llm,
+)
+
+
+# 2. Embeddings: Ollama embedding API
+def _ollama_alive(url: str) -> bool:
+    with urllib.request.urlopen(f"{url.rstrip('/')}/api/version", timeout=PROBE_TIMEOUT_SECONDS) as response:
+        return response.status == 200
+
+
+async def _probe_ollama(endpoint: Endpoint) -> bool:
+    return await asyncio.to_thread(_ollama_alive, endpoint.url)
+
+
+class OllamaEndpointPool(EndpointPool):
+    """
+    Ollama reports HTTP errors as ollama.ResponseError: 5xx / 429 mean "try another endpoint"
+    (4xx like an unknown model would fail the same way everywhere)
+    """
+
+    def _is_retriable(self, error: Exception) -> bool:
+        if isinstance(error, ollama.ResponseError):
+            return error.status_code >= 500 or error.status_code == 429
+        return super()._is_retriable(error)
+
+
+class PooledEmbeddings(Embeddings):
+    """
+    OllamaEmbeddings spread over EMBEDDING_ENDPOINTS (blocking, called from worker threads)
+    """
+
+    def __init__(self, model: str, urls: list[str] = EMBEDDING_ENDPOINTS):
+        self.model = model
+        self.pool = OllamaEndpointPool(
+            "embedding",
+            [
+                Endpoint(url, OllamaEmbeddings(model=model, base_url=url, client_kwargs={"timeout": EMBED_TIMEOUT_SECONDS}))
+                for url in urls
+            ],
+            retriable=(httpx.TransportError, ConnectionError, TimeoutError), # TransportError: connect / timeouts
+            probe=_probe_ollama,
+        )
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.pool.call_sync(lambda client: client.embed_documents(texts))
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.pool.call_sync(lambda client: client.embed_query(text))
@@ -0,0 +1,83 @@
+import threading
+from collections import defaultdict, deque
+
+# in-process counters and timings, exposed by GET /metrics
+# (per worker process; good enough to see reuse, hit rates and latency)
+
+_lock = threading.Lock()
+_counters: dict[str, int] = defaultdict(int)
+_timings: dict[str, deque] = {}
+_timing_counts: dict[str, int] = defaultdict(int)
+_gauges: dict[str, float] = {}
+_values: dict[str, deque] = {}
+
+# how many recent samples are kept per timing for percentiles
+TIMING_WINDOW = 1024
+
+
+def incr(name: str, value: int = 1):
+    with _lock:
+        _counters[name] += value
+
+
+def set_gauge(name: str, value: float):
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, seconds: float):
+    """
+    record one duration sample (in seconds)
+    """
+    with _lock:
+        samples = _timings.get(name)
+        if samples is None:
+            samples = _timings[name] = deque(maxlen=TIMING_WINDOW)
+        samples.append(seconds)
+        _timing_counts[name] += 1
+
+
+def record_value(name: str, value: float):
+    """
+    record one sample of a non-time quantity (ex: prompt tokens)
+    """
+    with _lock:
+        samples = _values.get(name)
+        if samples is None:
+            samples = _values[name] = deque(maxlen=TIMING_WINDOW)
+        samples.append(value)
+
+
+def _percentile(sorted_samples: list[float], q: float) -> float:
+    index = min(len(sorted_samples) - 1, int(round(q * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def snapshot() -> dict:
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        timings = {name: (sorted(samples), _timing_counts[name]) for name, samples in _timings.items()}
+        values = {name: sorted(samples) for name, samples in _values.items()}
+
+    timing_stats = {}
+    for name, (samples, count) in timings.items():
+        if not samples:
+            continue
+        timing_stats[name] = {
+            "count": count,
+            "avg_ms": sum(samples) / len(samples) * 1000,
+            "p50_ms": _percentile(samples, 0.50) * 1000,
+            "p95_ms": _percentile(samples, 0.95) * 1000,
+            "max_ms": samples[-1] * 1000,
+        }
+    value_stats = {
+        name: {
+            "avg": sum(samples) / len(samples),
+            "p50": _percentile(samples, 0.50),
+            "p95": _percentile(samples, 0.95),
+            "max": samples[-1],
+        }
+        for name, samples in values.items() if samples
+    }
+    return {"counters": counters, "gauges": gauges, "timings": timing_stats, "values": value_stats}
@@ -1,37 +1,421 @@
+import codecs
+import csv
+import multiprocessing
 import os
+import re
+import time
+import zipfile
+from collections import deque
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Callable, Iterator
+from xml.etree import ElementTree
+
 from pypdf import PdfReader
 
-def extract_text_from_file(file_path: str) -> str:
+from app.core import metrics
+from app.core.config import PDF_PARALLEL_MIN_PAGES, PDF_WORKERS, PDF_PAGE_TIMEOUT_SECONDS
+
+@dataclass
+class PageText:
+    index: int
+    total: int # 0 when the number of pages is not known up front (streamed text formats)
+    text: str
+    seconds: float = 0.0
+    error: str | None = None
+
+
+# -- PDF page extraction in worker processes --
+# every worker opens the PDF once, then extracts the pages it is given
+_worker_reader = None
+
+def _init_pdf_worker(file_path: str):
+    global _worker_reader
+    _worker_reader = PdfReader(file_path)
+
+def _extract_pdf_page(index: int) -> tuple[str, float]:
+    started = time.perf_counter()
+    page_text = _worker_reader.pages[index].extract_text() or ""
+    return page_text, time.perf_counter() - started
+
+
+def _clean_page_text(page_text: str) -> str:
+    if not page_text:
+        return ""
+    # prevent PostgreSQL error: remove NUL char(\x00)
+    return page_text.replace("\x00", "") + "\n"
+
+
+def _start_pdf_pool(file_path: str, workers: int):
+    return multiprocessing.get_context("spawn").Pool(
+        processes=workers,
+        initializer=_init_pdf_worker,
+        initargs=(file_path,),
+    )
+
+
+def _iter_pdf_pages_pooled(file_path: str, total: int, workers: int) -> Iterator[PageText]:
     """
-    returns texts in file from file_path
-    available formats: .txt, .pdf
+    pages are extracted in a process pool and yielded in order
+    only a bounded window of pages is in flight, so memory does not grow with the page count
+    a page that takes longer than PDF_PAGE_TIMEOUT_SECONDS is skipped (empty text, error set):
+    the pool is replaced (its stuck worker killed) and the other in-flight pages are submitted again
+    a page that raises is skipped the same way, the rest of the document is still extracted
     """
+    pool = _start_pdf_pool(file_path, workers)
+    try:
+        pending = deque()
+        next_index = 0
+        while next_index < total or pending:
+            while next_index < total and len(pending) < workers * 4:
+                pending.append((next_index, pool.apply_async(_extract_pdf_page, (next_index,))))
+                next_index += 1
+
+            index, result = pending.popleft()
+            try:
+                page_text, seconds = result.get(timeout=PDF_PAGE_TIMEOUT_SECONDS)
+                yield PageText(index, total, _clean_page_text(page_text), seconds)
+            except multiprocessing.TimeoutError:
+                metrics.incr("parser.pdf_page_timeout")
+                print(f"PDF page {index + 1}/{total} timed out: {file_path}")
+                # terminate (not close): the worker stuck on the malformed page must not keep running
+                pool.terminate()
+                pool.join()
+                pool = _start_pdf_pool(file_path, workers)
+                pending = deque(
+                    (queued, pool.apply_async(_extract_pdf_page, (queued,))) for queued, _ in pending
+                )
+                yield PageText(index, total, "", PDF_PAGE_TIMEOUT_SECONDS, error="timeout")
+            except Exception as e:
+                metrics.incr("parser.pdf_page_error")
+                print(f"PDF page {index + 1}/{total} failed: {e}")
+                yield PageText(index, total, "", 0.0, error=str(e))
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def iter_pdf_pages(file_path: str) -> Iterator[PageText]:
+    """
+    yield text of each PDF page in order
+    every PDF is extracted in worker processes, so a page that hangs or crashes pypdf is skipped
+    instead of blocking / failing the ingest job; large PDFs (>= PDF_PARALLEL_MIN_PAGES) get
+    PDF_WORKERS processes, smaller ones a single one
+    """
+    total = len(PdfReader(file_path).pages) # workers open their own reader
+    if total == 0:
+        return
+
+    workers = max(1, min(PDF_WORKERS, total)) if total >= PDF_PARALLEL_MIN_PAGES else 1
+    pages = _iter_pdf_pages_pooled(file_path, total, workers)
+
+    started = time.perf_counter()
+    slowest = None
+    for page in pages:
+        metrics.observe("parser.pdf_page", page.seconds)
+        if slowest is None or page.seconds > slowest.seconds:
+            slowest = page
+        yield page
+
+    if slowest is not None:
+        print(
+            f"Parsed {total} PDF pages in {time.perf_counter() - started:.2f}s "
+            f"(slowest: page {slowest.index + 1}, {slowest.seconds:.2f}s)"
+        )
+
+
+# -- format registry --
+# a handler takes (file_path, encoding) and yields PageText pieces, so big files never sit in memory at once
+# encoding is detected from the sniffed head for text formats (None for binary formats)
+
+# bytes read once from the start of a file for format sniffing and encoding detection
+SNIFF_BYTES = 64 * 1024
+# size of one yielded text piece for text-like formats
+TEXT_BLOCK_CHARS = 64 * 1024
+
+
+@dataclass
+class FileFormat:
+    name: str
+    handler: Callable[[str, str | None], Iterator[PageText]]
+    extensions: tuple[str, ...] = ()
+    sniff: Callable[[bytes, str], bool] | None = None # content check: (head bytes, file path)
+    is_text: bool = False
+
+
+PARSERS: dict[str, FileFormat] = {}
+
+
+class UnsupportedFormat(Exception):
+    """
+    binary file that no registered parser recognizes (the ingest job fails with this message)
+    """
+
+
+def register_parser(name: str, extensions: tuple[str, ...] = (), sniff=None, is_text: bool = False):
+    """
+    decorator: register a handler for a file format
+    formats with a sniff function are detected by content, others by extension
+    """
+    def decorator(handler):
+        PARSERS[name] = FileFormat(name, handler, extensions, sniff, is_text)
+        return handler
+    return decorator
+
+
+def _detect_encoding(head: bytes) -> str:
+    """
+    encoding of a text file from its first bytes only
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        # final=False: a multi-byte char cut at the end of head is not an error
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp949"
+
+
+def detect_format(file_path: str) -> tuple[FileFormat | None, str | None]:
+    """
+    (format, encoding) of a file: magic bytes first, extension as a hint for plain text formats
+    """
+    with open(file_path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
     ext = os.path.splitext(file_path)[1].lower()
-    text = ""
 
+    for file_format in PARSERS.values():
+        if file_format.sniff and file_format.sniff(head, file_path):
+            encoding = _detect_encoding(head) if file_format.is_text else None
+            return file_format, encoding
+
+    if b"\x00" in head and not head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        # binary content that no handler recognized
+        return None, None
+
+    for file_format in PARSERS.values():
+        if file_format.is_text and ext in file_format.extensions:
+            return file_format, _detect_encoding(head)
+    # unknown extension but text content: plain text
+    return PARSERS["text"], _detect_encoding(head)
+
+
+def _iter_text_blocks(file_path: str, encoding: str) -> Iterator[str]:
+    with open(file_path, "r", encoding=encoding, errors="replace", newline="") as f:
+        while True:
+            block = f.read(TEXT_BLOCK_CHARS)
+            if not block:
+                return
+            yield block.replace("\x00", "")
+
+
+def _iter_text_lines(file_path: str, encoding: str) -> Iterator[str]:
+    with open(file_path, "r", encoding=encoding, errors="replace", newline="") as f:
+        yield from f
+
+
+def _pages_from_pieces(pieces) -> Iterator[PageText]:
+    """
+    group small text pieces (paragraphs, rows, lines) into ~TEXT_BLOCK_CHARS pages
+    total is 0: page count is unknown while streaming
+    """
+    index = 0
+    buffer, size = [], 0
+    started = time.perf_counter()
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= TEXT_BLOCK_CHARS:
+            yield PageText(index, 0, "".join(buffer), time.perf_counter() - started)
+            index += 1
+            buffer, size = [], 0
+            started = time.perf_counter()
+    if buffer:
+        yield PageText(index, 0, "".join(buffer), time.perf_counter() - started)
+
+
+@register_parser("pdf", extensions=(".pdf",), sniff=lambda head, file_path: head.startswith(b"%PDF-"))
+def _parse_pdf(file_path: str, encoding: str | None) -> Iterator[PageText]:
+    yield from iter_pdf_pages(file_path)
+
+
+def _is_docx(head: bytes, file_path: str) -> bool:
+    # DOCX is a zip archive with a word/document.xml part (xlsx/pptx use xl/, ppt/)
+    # the central directory is read: entry order and big leading parts (embedded media) do not matter
+    if not head.startswith(b"PK\x03\x04"):
+        return False
     try:
-        if ext == ".txt":
+        with zipfile.ZipFile(file_path) as archive:
+            return "word/document.xml" in archive.namelist()
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+
+@register_parser("docx", extensions=(".docx",), sniff=_is_docx)
+def _parse_docx(file_path: str, encoding: str | None) -> Iterator[PageText]:
+    word_ns = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+    def paragraphs():
+        with zipfile.ZipFile(file_path) as archive:
+            with archive.open("word/document.xml") as xml_file:
+                # iterparse + clear: the XML tree is never fully built in memory
+                for _, elem in ElementTree.iterparse(xml_file, events=("end",)):
+                    if elem.tag == f"{word_ns}p":
+                        text = "".join(node.text or "" for node in elem.iter(f"{word_ns}t"))
+                        if text:
+                            yield text + "\n"
+                        elem.clear()
+                    elif elem.tag == f"{word_ns}tbl":
+                        elem.clear()
+
+    yield from _pages_from_pieces(paragraphs())
+
+
+class _HTMLTextExtractor(HTMLParser):
+    SKIP_TAGS = {"script", "style", "noscript", "template"}
+    BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "table"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+    def take(self) -> str:
+        text = "".join(self.parts)
+        self.parts = []
+        return text
+
+
+def _is_html(head: bytes, file_path: str) -> bool:
+    start = head[:1024].lstrip(codecs.BOM_UTF8).lstrip().lower()
+    return start.startswith((b"<!doctype html", b"<html")) or b"<html" in start[:256]
+
+
+@register_parser("html", extensions=(".html", ".htm"), sniff=_is_html, is_text=True)
+def _parse_html(file_path: str, encoding: str | None) -> Iterator[PageText]:
+    extractor = _HTMLTextExtractor()
+
+    def pieces():
+        for block in _iter_text_blocks(file_path, encoding):
+            extractor.feed(block)
+            yield extractor.take()
+        extractor.close()
+        yield extractor.take()
+
+    yield from _pages_from_pieces(pieces())
+
+
+_MD_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_MD_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_MD_LINE_PREFIX = re.compile(r"^\s{0,3}(#{1,6}\s+|>\s?|[-*+]\s+|\d+[.)]\s+)")
+# code spans keep their text untouched; emphasis markers are only removed in pairs that wrap text,
+# so snake_case_names, product_codes_A12 and "2 * 3" keep their underscores / asterisks
+_MD_CODE_SPAN = re.compile(r"(`+)(.+?)\1")
+_MD_STRONG = re.compile(r"(?<!\w)(\*\*|__)(?!\s)(.+?)(?<!\s)\1(?!\w)")
+_MD_EMPHASIS = [
+    re.compile(rf"(?<![\w{m}]){m}(?![\s{m}])(.+?)(?<![\s{m}]){m}(?![\w{m}])") for m in (r"\*", "_")
+]
+
+
+def _strip_md_emphasis(text: str) -> str:
+    text = _MD_STRONG.sub(r"\2", text)
+    for pattern in _MD_EMPHASIS:
+        text = pattern.sub(r"\1", text)
+    return text
+
+
+def _strip_md_inline(line: str) -> str:
+    parts, last = [], 0
+    for match in _MD_CODE_SPAN.finditer(line):
+        parts.append(_strip_md_emphasis(line[last:match.start()]))
+        parts.append(match.group(2))
+        last = match.end()
+    parts.append(_strip_md_emphasis(line[last:]))
+    return "".join(parts)
+
+
+@register_parser("markdown", extensions=(".md", ".markdown"), is_text=True)
+def _parse_markdown(file_path: str, encoding: str | None) -> Iterator[PageText]:
+    def lines():
+        for line in _iter_text_lines(file_path, encoding):
+            if line.lstrip().startswith("```"):
+                continue # code fence markers only, keep the code itself
+            line = _MD_IMAGE.sub(r"\1", line)
+            line = _MD_LINK.sub(r"\1", line)
+            line = _MD_LINE_PREFIX.sub("", line)
+            yield _strip_md_inline(line)
+
+    yield from _pages_from_pieces(lines())
+
+
+@register_parser("csv", extensions=(".csv", ".tsv"), is_text=True)
+def _parse_csv(file_path: str, encoding: str | None) -> Iterator[PageText]:
+    def rows():
+        with open(file_path, "r", encoding=encoding, errors="replace", newline="") as f:
+            sample = f.read(SNIFF_BYTES)
+            f.seek(0)
             try:
-                # read the file without parsing
-                with open(file_path, "r", encoding="utf-8") as f:
-                    text = f.read()
-            except UnicodeDecodeError:
-                with open(file_path, "r", encoding="cp949") as f:
-                    text = f.read()
-
-        elif ext == ".pdf":
-            # read each page then merge
-            reader = PdfReader(file_path)
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-            # prevent PostgreSQL error: remove NUL char(\x00)
-            text = text.replace("\x00", "")
-
-        else:
-            text = "Unsupported format"
+                dialect = csv.Sniffer().sniff(sample, delimiters=",\t;|")
+            except csv.Error:
+                dialect = csv.excel_tab if file_path.lower().endswith(".tsv") else csv.excel
+            reader = csv.reader(f, dialect)
+            header = next(reader, None)
+            if header is None:
+                return
+            # every row as "column: value" pairs, so a chunk keeps the meaning of its values
+            for row in reader:
+                pairs = [f"{name}: {value}" for name, value in zip(header, row) if value]
+                if pairs:
+                    yield ", ".join(pairs) + "\n"
+
+    yield from _pages_from_pieces(rows())
 
+
+@register_parser("text", extensions=(".txt", ".text", ".log"), is_text=True)
+def _parse_text(file_path: str, encoding: str | None) -> Iterator[PageText]:
+    yield from _pages_from_pieces(_iter_text_blocks(file_path, encoding))
+
+
+def iter_file_pages(file_path: str) -> Iterator[PageText]:
+    """
+    yield text of file_path piece by piece (PDF: one page per piece)
+    the format is sniffed from the file content (extension is only a hint for plain text formats)
+    available formats: see PARSERS (pdf, docx, html, markdown, csv, text)
+    raises UnsupportedFormat when none of them recognizes the file
+    """
+    file_format, encoding = detect_format(file_path)
+    if file_format is None:
+        raise UnsupportedFormat(f"Unsupported file format (supported: {', '.join(PARSERS)})")
+
+    yield from file_format.handler(file_path, encoding)
+
+
+def extract_text_from_file(file_path: str) -> str:
+    """
+    returns texts in file from file_path
+    available formats: see PARSERS
+    """
+    try:
+        text = "".join(page.text for page in iter_file_pages(file_path))
     except Exception as e:
         print(f"Error parsing file: {e}")
         text = f"Error extracting text: {str(e)}"
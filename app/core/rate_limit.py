@@ -0,0 +1,64 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+from app.core import metrics
+from app.core.config import LOGIN_WINDOW_SECONDS, LOGIN_MAX_ATTEMPTS_PER_IP, LOGIN_MAX_FAILURES_PER_EMAIL
+
+
+class SlidingWindowLimiter:
+    """
+    at most max_events per key within window_seconds
+    - retry_after(key) -> seconds until the key may try again (0: allowed now)
+    - only the max_keys most recently seen keys are tracked (a flood of new keys cannot grow memory)
+    in-process only: with several API workers each one counts on its own
+    """
+
+    def __init__(self, name: str, max_events: int, window_seconds: float, max_keys: int = 100_000):
+        self.name = name
+        self.max_events = max_events
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._events: OrderedDict[str, deque] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self, key: str, now: float) -> deque | None:
+        events = self._events.get(key)
+        if events is None:
+            return None
+        while events and events[0] <= now - self.window_seconds:
+            events.popleft()
+        if not events:
+            del self._events[key]
+            return None
+        return events
+
+    def retry_after(self, key: str) -> int:
+        now = time.monotonic()
+        with self._lock:
+            events = self._prune(key, now)
+            if events is None or len(events) < self.max_events:
+                return 0
+            metrics.incr(f"{self.name}.throttled")
+            return max(1, math.ceil(events[0] + self.window_seconds - now))
+
+    def hit(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            events = self._prune(key, now)
+            if events is None:
+                events = self._events[key] = deque()
+            events.append(now)
+            self._events.move_to_end(key)
+            while len(self._events) > self.max_keys:
+                self._events.popitem(last=False)
+
+    def reset(self, key: str):
+        with self._lock:
+            self._events.pop(key, None)
+
+
+# POST /auth/login: every attempt counts per client IP, failed attempts count per email
+login_ip_limiter = SlidingWindowLimiter("login.ip", LOGIN_MAX_ATTEMPTS_PER_IP, LOGIN_WINDOW_SECONDS)
+login_email_limiter = SlidingWindowLimiter("login.email", LOGIN_MAX_FAILURES_PER_EMAIL, LOGIN_WINDOW_SECONDS)
@@ -0,0 +1,119 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from app.core import metrics
+from app.core.config import RERANK_MODEL, RERANK_CANDIDATES, RERANK_BATCH_SIZE, RERANK_CACHE_SIZE
+
+# Second retrieval stage: a cross-encoder reads (question, chunk) together and scores relevance,
+# which is much more precise than embedding distance / BM25 but too slow for the whole document.
+# retrieval over-fetches RERANK_CANDIDATES chunks, only the best k are sent to the LLM
+# (a short prompt answers faster than a long one with a higher k)
+
+
+class CrossEncoderReranker:
+    """
+    local sentence-transformers CrossEncoder on CPU
+    - pairs are scored in batches of batch_size
+    - scores are cached by sha256(question, chunk), LRU up to cache_size entries
+    the model is loaded on first use (or by warm_up)
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 16, cache_size: int = 4096):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._model = None
+        self._model_lock = threading.Lock() # one predict at a time: it already uses every core
+        self._cache: OrderedDict[str, float] = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _get_model(self):
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder # optional dependency
+
+                started = time.perf_counter()
+                self._model = CrossEncoder(self.model_name, device="cpu")
+                print(f"Reranker '{self.model_name}' loaded in {time.perf_counter() - started:.1f}s.")
+            return self._model
+
+    def warm_up(self):
+        self._get_model()
+
+    def _key(self, query: str, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\n{query}\n{text}".encode("utf-8")).hexdigest()
+
+    def score(self, query: str, texts: list[str]) -> list[float]:
+        """
+        relevance of every text to query (higher is better), in input order
+        """
+        keys = [self._key(query, text) for text in texts]
+        scores: dict[str, float] = {}
+        with self._cache_lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[key] = self._cache[key]
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in scores}
+        metrics.incr("rerank_cache.hit", len(set(keys)) - len(missing))
+        metrics.incr("rerank_cache.miss", len(missing))
+
+        if missing:
+            model = self._get_model()
+            pairs = [(query, text) for text in missing.values()]
+            with self._model_lock:
+                predicted = model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            new_scores = {key: float(value) for key, value in zip(missing, predicted)}
+            scores.update(new_scores)
+
+            with self._cache_lock:
+                self._cache.update(new_scores)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return [scores[key] for key in keys]
+
+
+reranker = CrossEncoderReranker(RERANK_MODEL, RERANK_BATCH_SIZE, RERANK_CACHE_SIZE) if RERANK_MODEL else None
+
+
+def candidate_count(k: int) -> int:
+    """
+    how many chunks the first stage should return for a final top-k
+    """
+    return max(k, RERANK_CANDIDATES) if reranker else k
+
+
+def rerank(query: str, candidates: list, k: int, text=lambda candidate: candidate) -> list:
+    """
+    best k candidates by cross-encoder score (first k in the given order when re-ranking is off)
+    text(candidate) gives the chunk text (candidates may be (doc_id, text) pairs)
+    """
+    if reranker is None or len(candidates) <= 1:
+        return candidates[:k]
+    try:
+        scores = reranker.score(query, [text(candidate) for candidate in candidates])
+    except Exception as e:
+        print(f"Reranker Error: {e}")
+        return candidates[:k]
+    order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+    return [candidates[i] for i in order[:k]]
+
+
+def warm_up_reranker():
+    """
+    load the model on startup so the first question does not pay for it
+    """
+    global reranker
+
+    if reranker is None:
+        return
+    try:
+        reranker.warm_up()
+    except Exception as e:
+        # keep serving without re-ranking rather than failing startup
+        print(f"Reranker Error: {e} (re-ranking disabled)")
+        reranker = None
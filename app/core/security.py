@@ -1,9 +1,106 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core import metrics
+from app.core.config import BCRYPT_ROUNDS, PASSWORD_WORKERS, PASSWORD_MAX_PENDING
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+def _bcrypt_rounds(hashed_password: str) -> int | None:
+    # $2b$<rounds>$<salt + hash>
+    parts = hashed_password.split("$")
+    return int(parts[2]) if len(parts) > 3 and parts[2].isdigit() else None
+
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    hash made with a deprecated scheme or another cost than BCRYPT_ROUNDS
+    """
+    return pwd_context.needs_update(hashed_password) or _bcrypt_rounds(hashed_password) != BCRYPT_ROUNDS
+
+def verify_and_rehash(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    (valid, new hash if the stored one should be replaced) in one trip to a worker
+    """
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    if needs_rehash(hashed_password):
+        return True, hash_password(plain_password)
+    return True, None
+
+
+# Password worker pool
+# bcrypt takes ~250ms of CPU per call: in the request threadpool a burst of logins would starve
+# document / chat requests, in a separate process pool it only competes for PASSWORD_WORKERS cores
+
+class PasswordWorkersBusy(Exception):
+    """
+    more than PASSWORD_MAX_PENDING hashes already waiting for the pool
+    """
+
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_pending = 0 # event loop only
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=PASSWORD_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+async def _run(name: str, fn, *args):
+    global _pending
+
+    if _pending >= PASSWORD_MAX_PENDING:
+        metrics.incr("password.rejected")
+        raise PasswordWorkersBusy()
+    _pending += 1
+    metrics.set_gauge("password.pending", _pending)
+    started = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), fn, *args)
+    finally:
+        _pending -= 1
+        metrics.set_gauge("password.pending", _pending)
+        metrics.observe(f"password.{name}", time.perf_counter() - started)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run("hash", hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return await _run("verify", verify_and_rehash, plain_password, hashed_password)
+
+
+def start_password_workers():
+    """
+    called on startup: spawn the workers now, not on the first login
+    """
+    executor = _get_executor()
+    for _ in range(PASSWORD_WORKERS):
+        executor.submit(_bcrypt_rounds, "")
+
+
+def shutdown_password_workers():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,233 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core import metrics
+from app.core.ai import (
+    LLM_MODEL,
+    PARTIAL_SUMMARY_SYSTEM_PROMPT,
+    SUMMARY_SYSTEM_PROMPT,
+    summarize_text,
+    stream_summary,
+)
+from app.core.config import SUMMARY_MAP_CONCURRENCY, SUMMARY_REDUCE_MAX_CHARS
+from app.core.llm_gateway import LLMQueueFull
+from app.core.vector_store import split_text
+from app.db.session import AsyncSessionLocal
+from app.models.summary_cache import SummaryCache
+
+# Hierarchical map-reduce summarization
+# 1. map: every chunk (same chunks as the vector store) -> partial summary, in parallel
+# 2. reduce: partial summaries are grouped up to SUMMARY_REDUCE_MAX_CHARS and summarized again
+#    until one group is left
+# 3. final: 3-line summary of the last group
+# every LLM call is cached by sha256(kind + model + input text), so a repeated summarize is free
+# and an edited document only re-summarizes the chunks (and reduce groups) that changed
+
+# reduce rounds before giving up on shrinking (partials that do not get shorter)
+MAX_REDUCE_ROUNDS = 5
+# streaming: the last progress is sent again after this long without news (keeps proxies from timing out)
+PROGRESS_HEARTBEAT_SECONDS = 10
+
+
+@dataclass(frozen=True)
+class SummaryProgress:
+    """
+    map / reduce progress of a streamed summary: done of total texts summarized in this stage
+    """
+    stage: str
+    done: int
+    total: int
+
+
+def _cache_key(kind: str, text: str) -> str:
+    return hashlib.sha256(f"{kind}\n{LLM_MODEL}\n{text}".encode("utf-8")).hexdigest()
+
+
+async def _load_cached(keys: list[str]) -> dict[str, str]:
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(
+            select(SummaryCache.key, SummaryCache.summary).where(SummaryCache.key.in_(set(keys)))
+        )
+        return dict(rows.all())
+
+
+async def _save_cached(summaries: dict[str, str]):
+    if not summaries:
+        return
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            insert(SummaryCache)
+            .values([{"key": key, "model": LLM_MODEL, "summary": summary} for key, summary in summaries.items()])
+            .on_conflict_do_nothing(index_elements=["key"])
+        )
+        await db.commit()
+
+
+async def _cached_summaries(
+    texts: list[str], kind: str, system_prompt: str, temperature: float, on_progress=None
+) -> list[str]:
+    """
+    summarize every text (cache first, misses run in parallel), results in input order
+    on_progress(kind, done, total) is called as unique texts get their summary
+    """
+    keys = [_cache_key(kind, text) for text in texts]
+    found = await _load_cached(keys)
+
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in found and key not in missing:
+            missing[key] = text
+    metrics.incr("summary_cache.hit", len(set(keys)) - len(missing))
+    metrics.incr("summary_cache.miss", len(missing))
+
+    total = len(set(keys))
+    done = total - len(missing)
+    if on_progress:
+        on_progress(kind, done, total)
+
+    semaphore = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+
+    async def run(text: str) -> str:
+        nonlocal done
+        async with semaphore:
+            summary = await summarize_text(text, system_prompt=system_prompt, temperature=temperature)
+        done += 1
+        if on_progress:
+            on_progress(kind, done, total)
+        return summary
+
+    results = await asyncio.gather(*(run(text) for text in missing.values()), return_exceptions=True)
+
+    # keep what succeeded even if some calls failed, so a retry only pays for the failures
+    new_summaries = {}
+    errors = []
+    for key, result in zip(missing, results):
+        if isinstance(result, Exception):
+            errors.append(result)
+        else:
+            new_summaries[key] = result
+    await _save_cached(new_summaries)
+    if errors:
+        raise errors[0]
+
+    found.update(new_summaries)
+    return [found[key] for key in keys]
+
+
+def _group(partials: list[str], max_chars: int) -> list[str]:
+    """
+    join consecutive partial summaries into groups of at most max_chars
+    """
+    groups, current, size = [], [], 0
+    for partial in partials:
+        if current and size + len(partial) > max_chars:
+            groups.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(partial)
+        size += len(partial) + 2
+    if current:
+        groups.append("\n\n".join(current))
+    return groups
+
+
+async def _reduce_to_final_input(text: str, on_progress=None) -> str:
+    """
+    map + reduce rounds; returns the text the final 3-line summary is made from
+    """
+    chunks = await run_in_threadpool(split_text, text)
+    if len(chunks) <= 1:
+        return text
+
+    partials = await _cached_summaries(
+        chunks, "map", PARTIAL_SUMMARY_SYSTEM_PROMPT, temperature=0.3, on_progress=on_progress
+    )
+    for _ in range(MAX_REDUCE_ROUNDS):
+        groups = _group(partials, SUMMARY_REDUCE_MAX_CHARS)
+        if len(groups) == 1:
+            return groups[0]
+        partials = await _cached_summaries(
+            groups, "reduce", PARTIAL_SUMMARY_SYSTEM_PROMPT, temperature=0.3, on_progress=on_progress
+        )
+
+    return "\n\n".join(partials)[:SUMMARY_REDUCE_MAX_CHARS]
+
+
+async def summarize_document_text(text: str) -> str:
+    """
+    summary of a whole document in 3 lines
+    """
+    if not text:
+        return "Empty content"
+
+    try:
+        final_input = await _reduce_to_final_input(text)
+        summaries = await _cached_summaries([final_input], "final", SUMMARY_SYSTEM_PROMPT, temperature=0.7)
+        return summaries[0]
+    except LLMQueueFull:
+        raise # answered with 429 + Retry-After
+    except Exception as e:
+        print(f"AI Error: {e}")
+        return f"Summary failed: {str(e)}"
+
+
+async def _reduce_with_progress(text: str):
+    """
+    _reduce_to_final_input in a task: yields SummaryProgress as it goes (the last one again
+    every PROGRESS_HEARTBEAT_SECONDS without news), then the final input (str)
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(
+        _reduce_to_final_input(text, on_progress=lambda *args: queue.put_nowait(SummaryProgress(*args)))
+    )
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    last = SummaryProgress("map", 0, 0)
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), PROGRESS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield last
+                continue
+            if item is None:
+                break
+            last = item
+            yield item
+        yield task.result()
+    finally:
+        # client gone: stop the remaining map / reduce calls
+        task.cancel()
+
+
+async def stream_document_summary(text: str):
+    """
+    streaming version of summarize_document_text
+    yields SummaryProgress while the map/reduce steps run (cached), then the final summary token by token (str)
+    """
+    if not text:
+        yield "Empty content"
+        return
+
+    final_input = text
+    async for item in _reduce_with_progress(text):
+        if isinstance(item, SummaryProgress):
+            yield item
+        else:
+            final_input = item
+    key = _cache_key("final", final_input)
+    cached = await _load_cached([key])
+    if key in cached:
+        metrics.incr("summary_cache.hit")
+        yield cached[key]
+        return
+
+    metrics.incr("summary_cache.miss")
+    parts = []
+    async for token in stream_summary(final_input, system_prompt=SUMMARY_SYSTEM_PROMPT):
+        parts.append(token)
+        yield token
+    await _save_cached({key: "".join(parts)})
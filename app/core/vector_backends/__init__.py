@@ -0,0 +1,17 @@
+from app.core.vector_backends.base import VectorBackend
+
+
+def create_vector_backend(name: str, embeddings) -> VectorBackend:
+    """
+    backend selected by VECTOR_BACKEND (imported lazily: each one has its own client library)
+    """
+    if name == "chroma":
+        from app.core.vector_backends.chroma import ChromaBackend
+        return ChromaBackend(embeddings)
+    if name == "pgvector":
+        from app.core.vector_backends.pgvector import PgVectorBackend
+        return PgVectorBackend()
+    if name == "quantized":
+        from app.core.vector_backends.quantized import QuantizedBackend
+        return QuantizedBackend()
+    raise ValueError(f"Unknown VECTOR_BACKEND: {name!r} (expected 'chroma', 'pgvector' or 'quantized')")
@@ -0,0 +1,63 @@
+class VectorBackend:
+    """
+    storage of chunk vectors, used by app.core.vector_store
+    chunk IDs are the deterministic "<doc_id>:<hash>:<occurrence>" IDs from vector_store.chunk_ids
+    """
+
+    name = "base"
+
+    def open(self):
+        """
+        connect / create what is missing (called on startup and on first use)
+        """
+
+    def close(self):
+        """
+        release connections on shutdown
+        """
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def get_ids(self, doc_id: int) -> set[str]:
+        """
+        IDs of the chunks of a document
+        """
+        raise NotImplementedError
+
+    def upsert(self, doc_id: int, owner_id: int | None, ids: list[str],
+               vectors: list[list[float]], texts: list[str]):
+        raise NotImplementedError
+
+    def delete_ids(self, ids: list[str]):
+        raise NotImplementedError
+
+    def delete_document(self, doc_id: int):
+        raise NotImplementedError
+
+    def list_doc_ids(self) -> set[int]:
+        """
+        every doc_id that has chunks (for garbage collection)
+        """
+        raise NotImplementedError
+
+    def search(self, query_vector: list[float], k: int, doc_id: int | None = None,
+               owner_id: int | None = None, doc_ids: list[int] | None = None) -> list[tuple[int, str]]:
+        """
+        top-k (doc_id, chunk text) nearest to query_vector
+        filtered to one document (doc_id) or to the documents of an owner (owner_id, optionally doc_ids)
+        """
+        raise NotImplementedError
+
+    def iter_all(self, batch_size: int = 500):
+        """
+        every stored chunk, in batches of (id, doc_id, owner_id, vector, text) tuples
+        (copying vectors from one backend to another without embedding again)
+        """
+        raise NotImplementedError
+
+    def backfill_owner(self, owner_by_doc: dict[int, int]) -> int:
+        """
+        add owner_id to chunks stored without it, returns number of updated chunks
+        """
+        return 0
@@ -0,0 +1,155 @@
+import threading
+
+import chromadb
+from langchain_community.vectorstores import Chroma
+
+from app.core import metrics
+from app.core.vector_backends.base import VectorBackend
+
+# Vector DB path (in the current project directory)
+PERSIST_DIRECTORY = "./chroma_db"
+COLLECTION_NAME = "documents_collection"
+
+
+class ChromaBackend(VectorBackend):
+    """
+    local Chroma collection (one process / machine only: ./chroma_db cannot be shared by replicas)
+    one persistent client / collection handle is shared by all requests
+    (opening the SQLite/HNSW persistence per call is slow)
+    """
+
+    name = "chroma"
+
+    def __init__(self, embeddings, persist_directory: str = PERSIST_DIRECTORY,
+                 collection_name: str = COLLECTION_NAME):
+        self.embeddings = embeddings
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        self._client = None
+        self._collection = None
+        self._vectordb = None
+        self._lock = threading.Lock()
+
+    def _get_store(self):
+        """
+        returns (collection, langchain vectordb), opening them lazily on first use
+        """
+        vectordb = self._vectordb
+        if vectordb is not None:
+            metrics.incr("vectorstore.reused")
+            return self._collection, vectordb
+
+        with self._lock:
+            if self._vectordb is None:
+                self._client = chromadb.PersistentClient(path=self.persist_directory)
+                self._collection = self._client.get_or_create_collection(self.collection_name)
+                self._vectordb = Chroma(
+                    client=self._client,
+                    embedding_function=self.embeddings,
+                    collection_name=self.collection_name,
+                )
+                metrics.incr("vectorstore.opened")
+            else:
+                metrics.incr("vectorstore.reused")
+            return self._collection, self._vectordb
+
+    def open(self):
+        self._get_store()
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and hasattr(self._client, "clear_system_cache"):
+                self._client.clear_system_cache()
+            self._client = None
+            self._collection = None
+            self._vectordb = None
+
+    def count(self) -> int:
+        collection, _ = self._get_store()
+        return collection.count()
+
+    def get_ids(self, doc_id: int) -> set[str]:
+        collection, _ = self._get_store()
+        return set(collection.get(where={"doc_id": str(doc_id)}, include=[])["ids"])
+
+    def upsert(self, doc_id: int, owner_id: int | None, ids: list[str],
+               vectors: list[list[float]], texts: list[str]):
+        collection, _ = self._get_store()
+        # doc_id / owner_id filters for single-doc and corpus search
+        metadata = {"doc_id": str(doc_id)}
+        if owner_id is not None:
+            metadata["owner_id"] = str(owner_id)
+        collection.upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=[metadata for _ in ids])
+
+    def delete_ids(self, ids: list[str]):
+        collection, _ = self._get_store()
+        collection.delete(ids=ids)
+
+    def delete_document(self, doc_id: int):
+        collection, _ = self._get_store()
+        collection.delete(where={"doc_id": str(doc_id)})
+
+    def list_doc_ids(self, batch_size: int = 1000) -> set[int]:
+        collection, _ = self._get_store()
+        doc_ids = set()
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+            if not page["ids"]:
+                return doc_ids
+            offset += len(page["ids"])
+            doc_ids.update(int(metadata["doc_id"]) for metadata in page["metadatas"] if "doc_id" in metadata)
+
+    def search(self, query_vector: list[float], k: int, doc_id: int | None = None,
+               owner_id: int | None = None, doc_ids: list[int] | None = None) -> list[tuple[int, str]]:
+        _, vectordb = self._get_store()
+
+        if doc_id is not None:
+            where = {"doc_id": str(doc_id)}
+        else:
+            where = {"owner_id": str(owner_id)}
+            if doc_ids is not None:
+                where = {"$and": [where, {"doc_id": {"$in": [str(doc_id) for doc_id in doc_ids]}}]}
+
+        docs = vectordb.similarity_search_by_vector(embedding=query_vector, k=k, filter=where)
+        return [(int(doc.metadata["doc_id"]), doc.page_content) for doc in docs if doc.page_content]
+
+    def iter_all(self, batch_size: int = 500):
+        collection, _ = self._get_store()
+        offset = 0
+        while True:
+            page = collection.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+            if not len(page["ids"]):
+                return
+            offset += len(page["ids"])
+            yield [
+                (chunk_id, int(metadata["doc_id"]), int(metadata["owner_id"]) if "owner_id" in metadata else None,
+                 vector, chunk)
+                for chunk_id, metadata, vector, chunk in
+                zip(page["ids"], page["metadatas"], page["embeddings"], page["documents"])
+                if "doc_id" in metadata
+            ]
+
+    def backfill_owner(self, owner_by_doc: dict[int, int], batch_size: int = 500) -> int:
+        """
+        chunks indexed before corpus search existed have no owner_id metadata
+        """
+        collection, _ = self._get_store()
+        updated = 0
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+            if not page["ids"]:
+                return updated
+            offset += len(page["ids"])
+
+            ids, metadatas = [], []
+            for chunk_id, metadata in zip(page["ids"], page["metadatas"]):
+                owner_id = owner_by_doc.get(int(metadata.get("doc_id", -1)))
+                if "owner_id" in metadata or owner_id is None:
+                    continue
+                ids.append(chunk_id)
+                metadatas.append({**metadata, "owner_id": str(owner_id)})
+            if ids:
+                collection.update(ids=ids, metadatas=metadatas)
+                updated += len(ids)
@@ -0,0 +1,153 @@
+import threading
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core import metrics
+from app.core.config import PGVECTOR_EF_SEARCH
+from app.core.vector_backends.base import VectorBackend
+from app.db.session import engine
+from app.models.document import Document
+from app.models.document_vector import DocumentVector
+
+
+class PgVectorBackend(VectorBackend):
+    """
+    chunk vectors in the application Postgres (pgvector extension, HNSW index)
+    - every API replica sees the same vectors (no local ./chroma_db)
+    - owner filtering is a join with documents, so a corpus search is one SQL round-trip
+      and needs no owner_id copy on the chunks
+    - chunks are removed with their document (ON DELETE CASCADE)
+    - HNSW applies filters after the index scan, so a filtered search can come back short:
+      owner searches use iterative scans (pgvector >= 0.8) and fall back to an exact scan when
+      fewer than k rows are found; single-document searches are always exact (few rows)
+    """
+
+    name = "pgvector"
+
+    def __init__(self, bind=engine, ef_search: int = PGVECTOR_EF_SEARCH):
+        self.bind = bind
+        self.ef_search = ef_search
+        self._ready = False
+        self._iterative_scan = False
+        self._lock = threading.Lock()
+
+    def open(self):
+        if self._ready:
+            return
+        with self._lock:
+            if not self._ready:
+                with self.bind.begin() as conn:
+                    conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+                    version = conn.execute(
+                        text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+                    ).scalar_one()
+                # hnsw.iterative_scan only exists from pgvector 0.8 (setting it before is an error)
+                self._iterative_scan = tuple(int(part) for part in version.split(".")[:2]) >= (0, 8)
+                DocumentVector.__table__.create(bind=self.bind, checkfirst=True)
+                self._ready = True
+
+    def close(self):
+        self._ready = False
+
+    def count(self) -> int:
+        self.open()
+        with self.bind.connect() as conn:
+            return conn.execute(text("SELECT count(*) FROM document_vectors")).scalar_one()
+
+    def get_ids(self, doc_id: int) -> set[str]:
+        self.open()
+        with self.bind.connect() as conn:
+            rows = conn.execute(select(DocumentVector.id).where(DocumentVector.document_id == doc_id))
+            return {chunk_id for (chunk_id,) in rows}
+
+    def upsert(self, doc_id: int, owner_id: int | None, ids: list[str],
+               vectors: list[list[float]], texts: list[str]):
+        self.open()
+        stmt = insert(DocumentVector).values([
+            {"id": chunk_id, "document_id": doc_id, "content": chunk, "embedding": vector}
+            for chunk_id, vector, chunk in zip(ids, vectors, texts)
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={"content": stmt.excluded.content, "embedding": stmt.excluded.embedding},
+        )
+        with self.bind.begin() as conn:
+            conn.execute(stmt)
+
+    def delete_ids(self, ids: list[str]):
+        self.open()
+        with self.bind.begin() as conn:
+            conn.execute(delete(DocumentVector).where(DocumentVector.id.in_(ids)))
+
+    def delete_document(self, doc_id: int):
+        self.open()
+        with self.bind.begin() as conn:
+            conn.execute(delete(DocumentVector).where(DocumentVector.document_id == doc_id))
+
+    def list_doc_ids(self) -> set[int]:
+        self.open()
+        with self.bind.connect() as conn:
+            return {doc_id for (doc_id,) in conn.execute(select(DocumentVector.document_id).distinct())}
+
+    def iter_all(self, batch_size: int = 500):
+        self.open()
+        last_id = ""
+        while True:
+            stmt = (
+                select(
+                    DocumentVector.id, DocumentVector.document_id, Document.owner_id,
+                    DocumentVector.embedding, DocumentVector.content,
+                )
+                .join(Document, Document.id == DocumentVector.document_id)
+                .where(DocumentVector.id > last_id)
+                .order_by(DocumentVector.id)
+                .limit(batch_size)
+            )
+            with self.bind.connect() as conn:
+                rows = [tuple(row) for row in conn.execute(stmt)]
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield rows
+
+    def _search_stmt(self, query_vector: list[float], k: int, doc_id: int | None, owner_id: int | None,
+                     doc_ids: list[int] | None, exact: bool):
+        distance = DocumentVector.embedding.cosine_distance(query_vector).label("distance")
+        stmt = select(DocumentVector.document_id, DocumentVector.content, distance)
+        if doc_id is not None:
+            stmt = stmt.where(DocumentVector.document_id == doc_id)
+        else:
+            stmt = stmt.join(Document, Document.id == DocumentVector.document_id).where(Document.owner_id == owner_id)
+            if doc_ids is not None:
+                stmt = stmt.where(DocumentVector.document_id.in_(doc_ids))
+        if not exact:
+            return stmt.order_by(distance).limit(k)
+        # filtered rows are materialized first: the planner cannot answer from the HNSW index
+        candidates = stmt.cte("candidates").prefix_with("MATERIALIZED")
+        return (
+            select(candidates.c.document_id, candidates.c.content, candidates.c.distance)
+            .order_by(candidates.c.distance)
+            .limit(k)
+        )
+
+    def search(self, query_vector: list[float], k: int, doc_id: int | None = None,
+               owner_id: int | None = None, doc_ids: list[int] | None = None) -> list[tuple[int, str]]:
+        self.open()
+        # one document: its rows are found by the document_id index, exact distance on them is cheap
+        exact = doc_id is not None
+        with self.bind.begin() as conn:
+            if not exact:
+                # larger candidate list than the default 40: filtered HNSW scans drop non-matching rows
+                conn.execute(text(f"SET LOCAL hnsw.ef_search = {int(self.ef_search)}"))
+                if self._iterative_scan:
+                    # keep scanning the index until k rows pass the filter (results re-sorted below)
+                    conn.execute(text("SET LOCAL hnsw.iterative_scan = relaxed_order"))
+            rows = conn.execute(self._search_stmt(query_vector, k, doc_id, owner_id, doc_ids, exact)).all()
+            if not exact and len(rows) < k:
+                # owner / documents too small a part of the corpus for the index scan
+                metrics.incr("pgvector.exact_fallback")
+                rows = conn.execute(self._search_stmt(query_vector, k, doc_id, owner_id, doc_ids, True)).all()
+
+        rows.sort(key=lambda row: row.distance) # relaxed_order can return rows slightly out of order
+        return [(row_doc_id, content) for row_doc_id, content, _ in rows if content]
@@ -0,0 +1,369 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from app.core.config import EMBEDDING_DIMENSIONS, VECTOR_QUANTIZATION, QUANTIZED_RERANK_FACTOR
+from app.core.vector_backends.base import VectorBackend
+
+# Compact local index: quantized codes in RAM, full vectors on disk
+# - int8: one byte per dimension + one float scale per chunk (4x smaller than float32)
+# - binary: one bit per dimension, sign of each component (32x smaller), compared by Hamming distance
+# the top k * QUANTIZED_RERANK_FACTOR candidates by quantized score are re-ranked with the exact
+# cosine similarity of the float32 vectors, read from a memory-mapped file (only those rows are paged in)
+QUANTIZED_INDEX_DIRECTORY = "./quantized_index"
+
+QUANTIZATIONS = ("int8", "binary")
+
+# bits set in every byte value (Hamming distance of packed binary codes, numpy < 2.0)
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint16)
+
+# initial capacity of the in-memory arrays (doubled when full)
+_INITIAL_CAPACITY = 1024
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize(vectors: np.ndarray, quantization: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (codes, scales) of normalized float32 vectors
+    int8: symmetric per-vector scale, so the largest component maps to +-127
+    binary: packed sign bits (scales unused)
+    """
+    if quantization == "binary":
+        return np.packbits(vectors > 0, axis=1), np.ones(len(vectors), dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class QuantizedBackend(VectorBackend):
+    """
+    opt-in compact storage (VECTOR_BACKEND=quantized, VECTOR_QUANTIZATION=int8|binary), one process only
+    files in QUANTIZED_INDEX_DIRECTORY:
+    - vectors.f32: normalized float32 vectors, row after row (memory-mapped for re-ranking)
+    - codes.<quantization>: quantized codes, loaded into RAM (rebuilt from vectors.f32 if missing)
+    - chunks.sqlite3: row -> chunk ID, doc_id, owner_id, scale, text
+    rows of deleted chunks are reused by later inserts
+    """
+
+    name = "quantized"
+
+    def __init__(self, directory: str = QUANTIZED_INDEX_DIRECTORY, dim: int = EMBEDDING_DIMENSIONS,
+                 quantization: str = VECTOR_QUANTIZATION, rerank_factor: int = QUANTIZED_RERANK_FACTOR):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown VECTOR_QUANTIZATION: {quantization!r} (expected 'int8' or 'binary')")
+        self.directory = directory
+        self.dim = dim
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        self.code_bytes = (dim + 7) // 8 if quantization == "binary" else dim
+
+        self._lock = threading.RLock()
+        self._conn = None
+        self._vector_fd = None
+        self._code_fd = None
+        self._mmap = None
+
+        # in-memory state, valid for rows < _size
+        self._size = 0
+        self._codes = None
+        self._scales = None
+        self._doc_ids = None
+        self._owner_ids = None # -1: no owner recorded
+        self._alive = None
+        self._free_rows: list[int] = []
+
+    # --- storage -------------------------------------------------------------------------------
+
+    def open(self):
+        with self._lock:
+            if self._conn is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.directory, "chunks.sqlite3"), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                " row INTEGER PRIMARY KEY,"
+                " id TEXT NOT NULL UNIQUE,"
+                " doc_id INTEGER NOT NULL,"
+                " owner_id INTEGER,"
+                " scale REAL NOT NULL,"
+                " text TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_chunks_doc_id ON chunks (doc_id)")
+            self._conn.commit()
+
+            vector_path = os.path.join(self.directory, "vectors.f32")
+            code_path = os.path.join(self.directory, f"codes.{self.quantization}")
+            for other in QUANTIZATIONS:
+                # codes of another quantization went stale while this one was in use
+                if other != self.quantization and os.path.exists(os.path.join(self.directory, f"codes.{other}")):
+                    os.remove(os.path.join(self.directory, f"codes.{other}"))
+            self._vector_fd = os.open(vector_path, os.O_RDWR | os.O_CREAT)
+            self._code_fd = os.open(code_path, os.O_RDWR | os.O_CREAT)
+
+            rows = self._conn.execute("SELECT row, doc_id, owner_id, scale FROM chunks").fetchall()
+            self._size = max((row for row, *_ in rows), default=-1) + 1
+            self._codes = self._scales = self._doc_ids = self._owner_ids = self._alive = None
+            self._allocate(max(self._size, _INITIAL_CAPACITY))
+            for row, doc_id, owner_id, scale in rows:
+                self._doc_ids[row] = doc_id
+                self._owner_ids[row] = -1 if owner_id is None else owner_id
+                self._scales[row] = scale
+                self._alive[row] = True
+            self._free_rows = [row for row in range(self._size) if not self._alive[row]]
+            self._load_codes(code_path)
+
+    def _load_codes(self, code_path: str):
+        """
+        codes file of the current quantization, rebuilt from the float32 vectors when missing / short
+        (ex: after switching VECTOR_QUANTIZATION)
+        """
+        expected = self._size * self.code_bytes
+        if os.path.getsize(code_path) >= expected:
+            dtype = np.uint8 if self.quantization == "binary" else np.int8
+            codes = np.fromfile(code_path, dtype=dtype, count=expected)
+            self._codes[:self._size] = codes.reshape(self._size, self.code_bytes)
+            return
+
+        vectors = self._vectors()
+        for start in range(0, self._size, 4096):
+            block = np.asarray(vectors[start:start + 4096], dtype=np.float32)
+            codes, scales = quantize(block, self.quantization)
+            self._codes[start:start + len(block)] = codes
+            os.pwrite(self._code_fd, codes.tobytes(), start * self.code_bytes)
+            if self.quantization == "int8":
+                self._scales[start:start + len(block)] = scales
+        if self.quantization == "int8":
+            self._conn.executemany(
+                "UPDATE chunks SET scale = ? WHERE row = ?",
+                [(float(self._scales[row]), row) for row in range(self._size) if self._alive[row]],
+            )
+            self._conn.commit()
+        print(f"Quantized index: rebuilt {self.quantization} codes of {self._size} rows.")
+
+    def _allocate(self, capacity: int):
+        """
+        grow the in-memory arrays to capacity rows (keeping rows < _size)
+        """
+        def grow(old, shape, dtype, fill=0):
+            new = np.full(shape, fill, dtype=dtype)
+            if old is not None:
+                new[:self._size] = old[:self._size]
+            return new
+
+        code_dtype = np.uint8 if self.quantization == "binary" else np.int8
+        self._codes = grow(self._codes, (capacity, self.code_bytes), code_dtype)
+        self._scales = grow(self._scales, capacity, np.float32, 1.0)
+        self._doc_ids = grow(self._doc_ids, capacity, np.int64, -1)
+        self._owner_ids = grow(self._owner_ids, capacity, np.int64, -1)
+        self._alive = grow(self._alive, capacity, bool, False)
+
+    def _vectors(self) -> np.ndarray:
+        """
+        memory-mapped float32 vectors (re-mapped when the file has grown)
+        """
+        if self._mmap is None or len(self._mmap) < self._size:
+            self._mmap = None
+            if self._size == 0:
+                return np.empty((0, self.dim), dtype=np.float32)
+            self._mmap = np.memmap(
+                os.path.join(self.directory, "vectors.f32"), dtype=np.float32, mode="r", shape=(self._size, self.dim)
+            )
+        return self._mmap
+
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            self._conn.close()
+            os.close(self._vector_fd)
+            os.close(self._code_fd)
+            self._conn = None
+            self._mmap = None
+            self._codes = self._scales = self._doc_ids = self._owner_ids = self._alive = None
+
+    def memory_bytes(self) -> int:
+        """
+        RAM held by the index (codes + per-row arrays); full vectors stay on disk
+        """
+        with self._lock:
+            self.open()
+            return sum(array.nbytes for array in (
+                self._codes, self._scales, self._doc_ids, self._owner_ids, self._alive
+            ))
+
+    # --- VectorBackend -------------------------------------------------------------------------
+
+    def count(self) -> int:
+        with self._lock:
+            self.open()
+            return int(self._alive[:self._size].sum())
+
+    def get_ids(self, doc_id: int) -> set[str]:
+        with self._lock:
+            self.open()
+            return {chunk_id for (chunk_id,) in self._conn.execute("SELECT id FROM chunks WHERE doc_id = ?", (doc_id,))}
+
+    def upsert(self, doc_id: int, owner_id: int | None, ids: list[str],
+               vectors: list[list[float]], texts: list[str]):
+        normalized = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim))
+        codes, scales = quantize(normalized, self.quantization)
+
+        with self._lock:
+            self.open()
+            existing = dict(self._conn.execute(
+                f"SELECT id, row FROM chunks WHERE id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall()) if ids else {}
+
+            records = []
+            for i, (chunk_id, chunk) in enumerate(zip(ids, texts)):
+                row = existing.get(chunk_id)
+                if row is None:
+                    row = self._free_rows.pop() if self._free_rows else self._next_row()
+                # vector + code first: a crash before the commit below only leaves an unused row
+                os.pwrite(self._vector_fd, normalized[i].tobytes(), row * self.dim * 4)
+                os.pwrite(self._code_fd, codes[i].tobytes(), row * self.code_bytes)
+                self._codes[row] = codes[i]
+                self._scales[row] = scales[i]
+                self._doc_ids[row] = doc_id
+                self._owner_ids[row] = -1 if owner_id is None else owner_id
+                self._alive[row] = True
+                records.append((row, chunk_id, doc_id, owner_id, float(scales[i]), chunk))
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (row, id, doc_id, owner_id, scale, text) VALUES (?, ?, ?, ?, ?, ?)",
+                records,
+            )
+            self._conn.commit()
+
+    def _next_row(self) -> int:
+        if self._size == len(self._alive):
+            self._allocate(len(self._alive) * 2)
+        self._size += 1
+        return self._size - 1
+
+    def _delete_rows(self, rows: list[int]):
+        if not rows:
+            return
+        self._conn.executemany("DELETE FROM chunks WHERE row = ?", [(row,) for row in rows])
+        self._conn.commit()
+        for row in rows:
+            self._alive[row] = False
+            self._doc_ids[row] = -1
+        self._free_rows.extend(rows)
+
+    def delete_ids(self, ids: list[str]):
+        with self._lock:
+            self.open()
+            rows = [
+                row for (row,) in self._conn.execute(
+                    f"SELECT row FROM chunks WHERE id IN ({','.join('?' * len(ids))})", ids
+                )
+            ] if ids else []
+            self._delete_rows(rows)
+
+    def delete_document(self, doc_id: int):
+        with self._lock:
+            self.open()
+            rows = [row for (row,) in self._conn.execute("SELECT row FROM chunks WHERE doc_id = ?", (doc_id,))]
+            self._delete_rows(rows)
+
+    def list_doc_ids(self) -> set[int]:
+        with self._lock:
+            self.open()
+            return {doc_id for (doc_id,) in self._conn.execute("SELECT DISTINCT doc_id FROM chunks")}
+
+    def iter_all(self, batch_size: int = 500):
+        last_row = -1
+        while True:
+            with self._lock:
+                self.open()
+                page = self._conn.execute(
+                    "SELECT row, id, doc_id, owner_id, text FROM chunks WHERE row > ? ORDER BY row LIMIT ?",
+                    (last_row, batch_size),
+                ).fetchall()
+                if not page:
+                    return
+                vectors = self._vectors()
+                batch = [
+                    (chunk_id, doc_id, owner_id, np.array(vectors[row]), chunk)
+                    for row, chunk_id, doc_id, owner_id, chunk in page
+                ]
+            last_row = page[-1][0]
+            yield batch
+
+    def search(self, query_vector: list[float], k: int, doc_id: int | None = None,
+               owner_id: int | None = None, doc_ids: list[int] | None = None) -> list[tuple[int, str]]:
+        query = _normalize(np.asarray(query_vector, dtype=np.float32).reshape(1, self.dim))
+        query_codes, query_scales = quantize(query, self.quantization)
+
+        with self._lock:
+            self.open()
+            size = self._size
+            codes = self._codes[:size]
+            scales = self._scales[:size]
+            if doc_id is not None:
+                mask = self._doc_ids[:size] == doc_id
+            else:
+                mask = self._owner_ids[:size] == owner_id
+                if doc_ids is not None:
+                    mask &= np.isin(self._doc_ids[:size], doc_ids)
+            mask &= self._alive[:size]
+            candidates = np.flatnonzero(mask)
+            vectors = self._vectors()
+
+        if not len(candidates):
+            return []
+
+        # 1. quantized scores (higher is closer)
+        if self.quantization == "binary":
+            differing = np.bitwise_xor(codes[candidates], query_codes[0])
+            if hasattr(np, "bitwise_count"): # numpy >= 2.0
+                distances = np.bitwise_count(differing).sum(axis=1, dtype=np.int32)
+            else:
+                distances = _POPCOUNT[differing].sum(axis=1)
+            approx = -distances.astype(np.float32)
+        else:
+            # float32 product (BLAS) is much faster than an integer one; int8 values are exact in float32
+            approx = (codes[candidates].astype(np.float32) @ query_codes[0].astype(np.float32)) * scales[candidates]
+
+        n_rerank = min(len(candidates), max(k, k * self.rerank_factor))
+        if n_rerank < len(candidates):
+            shortlist = candidates[np.argpartition(-approx, n_rerank - 1)[:n_rerank]]
+        else:
+            shortlist = candidates
+        shortlist = np.sort(shortlist) # sequential reads from the memory-mapped file
+
+        # 2. exact cosine similarity on the float32 vectors of the shortlist
+        exact = np.asarray(vectors[shortlist], dtype=np.float32) @ query[0]
+        best = shortlist[np.argsort(-exact)[:k]]
+
+        with self._lock:
+            placeholders = ",".join("?" * len(best))
+            texts = dict(
+                ((row, (row_doc_id, chunk)) for row, row_doc_id, chunk in self._conn.execute(
+                    f"SELECT row, doc_id, text FROM chunks WHERE row IN ({placeholders})", [int(row) for row in best]
+                ))
+            )
+        return [texts[int(row)] for row in best if int(row) in texts and texts[int(row)][1]]
+
+    def backfill_owner(self, owner_by_doc: dict[int, int]) -> int:
+        with self._lock:
+            self.open()
+            updated = 0
+            for doc_id, owner_id in owner_by_doc.items():
+                updated += self._conn.execute(
+                    "UPDATE chunks SET owner_id = ? WHERE doc_id = ? AND owner_id IS NULL", (owner_id, doc_id)
+                ).rowcount
+                rows = (self._doc_ids[:self._size] == doc_id) & (self._owner_ids[:self._size] == -1)
+                self._owner_ids[:self._size][rows] = owner_id
+            self._conn.commit()
+            return updated
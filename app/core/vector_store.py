@@ -1,77 +1,291 @@
-from langchain_community.vectorstores import Chroma
-from langchain_ollama import OllamaEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-
-# 1. Vector DB path (in the current project directory)
-PERSIST_DIRECTORY = "./chroma_db"
-COLLECTION_NAME = "documents_collection"
-
-# 2. Create embedding model object (using local Ollama)
-embeddings = OllamaEmbeddings(
-    model="nomic-embed-text",
-    base_url="http://localhost:11434" # local host
+import threading
+import time
+
+from app.core import metrics
+from app.core.chunking import chunk_hash, iter_chunks
+from app.core.config import (
+    EMBED_BATCH_SIZE,
+    EMBED_CONCURRENCY,
+    EMBED_CACHE_PATH,
+    CORPUS_KEYWORD_MAX_DOCS,
+    VECTOR_BACKEND,
+)
+from app.core.embeddings import BatchedEmbeddings, EmbeddingCache
+from app.core.llm_pool import PooledEmbeddings
+from app.core.keyword_index import (
+    build_keyword_index,
+    delete_keyword_index,
+    search_keyword_index,
+    search_keyword_index_scored,
 )
+from app.core.reranker import candidate_count, rerank
+from app.core.vector_backends import VectorBackend, create_vector_backend
+
+# 1. Create embedding model object (Ollama servers in EMBEDDING_ENDPOINTS, least busy one first)
+EMBEDDING_MODEL = "nomic-embed-text"
+embeddings = BatchedEmbeddings(
+    PooledEmbeddings(EMBEDDING_MODEL),
+    model=EMBEDDING_MODEL,
+    cache=EmbeddingCache(EMBED_CACHE_PATH), # same chunk text is embedded only once
+    batch_size=EMBED_BATCH_SIZE,
+    concurrency=EMBED_CONCURRENCY,
+)
+
+# 2. Process-wide vector backend (VECTOR_BACKEND: local Chroma or pgvector in Postgres)
+_backend: VectorBackend | None = None
+_backend_lock = threading.Lock()
 
-def save_document_to_vectorstore(doc_id: int, text: str):
+def _get_backend() -> VectorBackend:
+    global _backend
+
+    backend = _backend
+    if backend is not None:
+        return backend
+
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_vector_backend(VECTOR_BACKEND, embeddings)
+            _backend.open()
+        return _backend
+
+def warm_up_vectorstore():
     """
-    split text in doc to chunk then store into vector DB
+    open the store on startup so the first request does not pay for it
+    """
+    backend = _get_backend()
+    print(f"Vector DB ready: {backend.count()} chunks ({backend.name}).")
+
+def close_vectorstore():
+    """
+    drop the shared handles on shutdown
+    """
+    global _backend
+
+    with _backend_lock:
+        if _backend is not None:
+            _backend.close()
+        _backend = None
+
+def split_stream(pieces):
+    """
+    split a stream of text pieces (ex: PDF pages) into chunks, yielding chunks as they are ready
+    content-defined boundaries (see app.core.chunking): chunks only depend on the text itself,
+    so split_stream(pages) == split_text("".join(pages)) and an edit only changes nearby chunks
+    """
+    for chunk in iter_chunks(pieces):
+        if chunk.strip():
+            yield chunk
+
+def split_text(text: str) -> list[str]:
+    """
+    split text into chunks for embedding
     """
     if not text:
-        return
-
-    # 1. Chunking
-    # chunk_size=1000: split every 1000 character
-    # chunk_overlap=200: overlap 200 characters in cotinuous chunks
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
-    )
-    chunks = text_splitter.create_documents([text])
+        return []
+    return list(split_stream([text]))
 
-    # 2. Add metadata (save doc_id to search only in this document)
+def embed_chunks(chunks: list[str], on_progress=None) -> list[list[float]]:
+    """
+    embed chunks in concurrent batches (cached chunks are skipped)
+    on_progress(done, total) is called after every batch
+    """
+    return embeddings.embed_many(chunks, on_progress=on_progress)
+
+def chunk_ids(doc_id: int, chunks: list[str]) -> list[str]:
+    """
+    deterministic chunk IDs: "<doc_id>:<sha256(chunk)[:32]>:<n-th occurrence of that text>"
+    an unchanged chunk keeps its ID across re-indexing, so only new/changed chunks are embedded
+    """
+    ids = []
+    seen: dict[str, int] = {}
     for chunk in chunks:
-        chunk.metadata = {"doc_id": str(doc_id)}
-
-    # 3. Store in Vector DB
-    # collection_name="doc": concept like table
-    Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        persist_directory=PERSIST_DIRECTORY,
-        collection_name=COLLECTION_NAME,
+        digest = chunk_hash(chunk)[:32]
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        ids.append(f"{doc_id}:{digest}:{occurrence}")
+    return ids
+
+def get_indexed_chunk_ids(doc_id: int) -> set[str]:
+    """
+    IDs of the chunks of a document currently in vector DB
+    """
+    return _get_backend().get_ids(doc_id)
+
+def plan_chunk_update(doc_id: int, chunks: list[str], indexed_ids: set[str] | None = None) -> list[int]:
+    """
+    positions of chunks that are not in vector DB yet (the only ones that need embedding)
+    indexed_ids: IDs already known to be indexed (ex: from document_chunks), else vector DB is asked
+    """
+    indexed = get_indexed_chunk_ids(doc_id) if indexed_ids is None else indexed_ids
+    return [position for position, chunk_id in enumerate(chunk_ids(doc_id, chunks)) if chunk_id not in indexed]
+
+def index_chunks(doc_id: int, chunks: list[str], new_vectors: dict[int, list[float]],
+                 owner_id: int | None = None, indexed_ids: set[str] | None = None):
+    """
+    make vector DB match the new chunk list of a document
+    new_vectors: {position: vector} for the chunks returned by plan_chunk_update
+    indexed_ids: same as for plan_chunk_update (None: vector DB is asked)
+    - chunks no longer present are deleted by ID
+    - new chunks are upserted with their vectors
+    - kept chunks are not touched
+    running it twice is harmless, so a resumed job does not duplicate chunks
+    """
+    backend = _get_backend()
+
+    ids = chunk_ids(doc_id, chunks)
+    indexed = get_indexed_chunk_ids(doc_id) if indexed_ids is None else indexed_ids
+
+    stale = list(indexed - set(ids))
+    if stale:
+        backend.delete_ids(stale)
+
+    new_positions = [position for position in range(len(chunks)) if position in new_vectors]
+    if new_positions:
+        backend.upsert(
+            doc_id,
+            owner_id,
+            ids=[ids[position] for position in new_positions],
+            vectors=[new_vectors[position] for position in new_positions],
+            texts=[chunks[position] for position in new_positions],
+        )
+
+    # BM25 index of the same chunks (hybrid retrieval)
+    build_keyword_index(doc_id, chunks)
+    print(
+        f"Document {doc_id} indexed: {len(new_positions)} new, "
+        f"{len(chunks) - len(new_positions)} kept, {len(stale)} removed chunks."
     )
-    # ChromaDB is automatically saved, but still call persist()  to make sure (compatible with old versions)
-    # recent versions: auto-save
-    print(f"Document {doc_id} saved to Vector DB with {len(chunks)} chunks.")
+
+def save_document_to_vectorstore(doc_id: int, text: str, owner_id: int | None = None):
+    """
+    split text in doc to chunk then store into vector DB (only changed chunks are embedded)
+    """
+    chunks = split_text(text or "")
+    new_positions = plan_chunk_update(doc_id, chunks)
+    vectors = embed_chunks([chunks[position] for position in new_positions])
+    index_chunks(doc_id, chunks, dict(zip(new_positions, vectors)), owner_id=owner_id)
 
 def delete_document_from_vectorstore(doc_id: int):
     """
-    when deleting docs, remove from vector DB"
+    when deleting docs, remove from vector DB (and its keyword index)
     """
-    vectordb = Chroma(
-        persist_directory=PERSIST_DIRECTORY,
-        embedding_function=embeddings,
-        collection_name=COLLECTION_NAME,
-    )
+    _get_backend().delete_document(doc_id)
+    delete_keyword_index(doc_id)
 
-    # delete data matching doc_id
-    # 실제로는 get으로 id 목록을 받아와서 delete 해야 함
-    pass
+def list_indexed_doc_ids() -> set[int]:
+    """
+    every doc_id that has chunks in vector DB (for garbage collection)
+    """
+    return _get_backend().list_doc_ids()
 
 
-def search_document_contexts(doc_id: int, query: str, k: int = 4) -> list[str]:
+def embed_query(query: str) -> list[float]:
     """
-    Find top-k relevant chunks in vector DB for a single document.
+    embedding of a question (shared by answer cache lookup and vector search)
     """
-    vectordb = Chroma(
-        persist_directory=PERSIST_DIRECTORY,
-        embedding_function=embeddings,
-        collection_name=COLLECTION_NAME,
-    )
-    docs = vectordb.similarity_search(
-        query=query,
-        k=k,
-        filter={"doc_id": str(doc_id)},
-    )
-    return [doc.page_content for doc in docs if doc.page_content]
+    return embeddings.embed_query(query)
+
+
+# reciprocal rank fusion constant (60 in the original RRF paper)
+RRF_K = 60
+
+def reciprocal_rank_fusion(rankings: list[list], k: int) -> list:
+    """
+    merge ranked chunk lists: score = sum(1 / (RRF_K + rank)) over the lists a chunk appears in
+    (items are chunk texts, or (doc_id, text) pairs for corpus search)
+    """
+    scores: dict = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, start=1):
+            scores[chunk] = scores.get(chunk, 0.0) + 1.0 / (RRF_K + rank)
+    return sorted(scores, key=scores.get, reverse=True)[:k]
+
+
+def search_document_contexts(doc_id: int, query: str, k: int = 4,
+                             query_vector: list[float] | None = None) -> list[str]:
+    """
+    Find top-k relevant chunks for a single document.
+    vector search and BM25 keyword search are fused with reciprocal rank fusion;
+    with a reranker, candidate_count(k) chunks are fused and the cross-encoder keeps the best k
+    pass query_vector when the question is already embedded
+    """
+    n_candidates = candidate_count(k)
+    timings = {}
+
+    started = time.perf_counter()
+    if query_vector is None:
+        query_vector = embed_query(query)
+    vector_hits = [chunk for _, chunk in _get_backend().search(query_vector, k=n_candidates, doc_id=doc_id)]
+    timings["vector"] = time.perf_counter() - started
 
+    started = time.perf_counter()
+    keyword_hits = search_keyword_index(doc_id, query, k=n_candidates)
+    timings["keyword"] = time.perf_counter() - started
+
+    candidates = reciprocal_rank_fusion([vector_hits, keyword_hits], k=n_candidates)
+    started = time.perf_counter()
+    contexts = rerank(query, candidates, k=k)
+    timings["rerank"] = time.perf_counter() - started
+
+    _log_retrieval(f"doc {doc_id}", timings, len(candidates), len(contexts))
+    return contexts
+
+
+def search_corpus_contexts(owner_id: int, query: str, k: int = 4, doc_ids: list[int] | None = None,
+                           keyword_doc_ids: list[int] | None = None,
+                           query_vector: list[float] | None = None) -> list[tuple[int, str]]:
+    """
+    Find top-k relevant (doc_id, chunk) across all documents of an owner, or a subset (doc_ids),
+    in one filtered vector query instead of one query per document.
+    BM25 indexes are per document: keyword_doc_ids (default: doc_ids) are searched on the keyword side,
+    which is skipped for more than CORPUS_KEYWORD_MAX_DOCS documents
+    re-ranked like search_document_contexts
+    """
+    n_candidates = candidate_count(k)
+    timings = {}
+
+    started = time.perf_counter()
+    if query_vector is None:
+        query_vector = embed_query(query)
+    vector_hits = _get_backend().search(query_vector, k=n_candidates, owner_id=owner_id, doc_ids=doc_ids)
+    timings["corpus_vector"] = time.perf_counter() - started
+
+    if keyword_doc_ids is None:
+        keyword_doc_ids = doc_ids
+    keyword_hits = []
+    if keyword_doc_ids and len(keyword_doc_ids) <= CORPUS_KEYWORD_MAX_DOCS:
+        started = time.perf_counter()
+        scored = [
+            (score, doc_id, chunk)
+            for doc_id in keyword_doc_ids
+            for score, chunk in search_keyword_index_scored(doc_id, query, k=n_candidates)
+        ]
+        scored.sort(key=lambda hit: hit[0], reverse=True)
+        keyword_hits = [(doc_id, chunk) for _, doc_id, chunk in scored[:n_candidates]]
+        timings["corpus_keyword"] = time.perf_counter() - started
+
+    candidates = reciprocal_rank_fusion([vector_hits, keyword_hits], k=n_candidates)
+    started = time.perf_counter()
+    hits = rerank(query, candidates, k=k, text=lambda hit: hit[1])
+    timings["rerank"] = time.perf_counter() - started
+
+    _log_retrieval(f"owner {owner_id}", timings, len(candidates), len(hits))
+    return hits
+
+
+def _log_retrieval(target: str, timings: dict[str, float], n_candidates: int, n_kept: int):
+    """
+    per-stage timing: retrieval.<stage> metrics and one log line per search
+    """
+    for stage, seconds in timings.items():
+        metrics.observe(f"retrieval.{stage}", seconds)
+    stages = ", ".join(f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in timings.items())
+    print(f"Retrieval ({target}): {stages}; {n_candidates} candidates -> {n_kept}")
+
+
+def backfill_owner_metadata(owner_by_doc: dict[int, int]) -> int:
+    """
+    add owner_id to chunks indexed before corpus search existed, returns number of updated chunks
+    (nothing to do for pgvector: owners come from the documents table)
+    """
+    return _get_backend().backfill_owner(owner_by_doc)
@@ -1,8 +1,35 @@
+from sqlalchemy import text
+
 from app.db.session import engine
 from app.models.user import Base
 # 모델들을 import 해줘야 Base가 "아, 이런 테이블을 만들어야 하는구나" 하고 알 수 있음!
 from app.models.user import User
 from app.models.document import Document
+from app.models.ingest_job import IngestJob
+from app.models.summary_cache import SummaryCache
+from app.models.document_chunk import DocumentChunk
+from app.models.document_content import DocumentContent
+
+# create_all only creates missing tables: columns / indexes added to existing tables are added here
+# every statement is idempotent (IF NOT EXISTS), so this runs on every startup
+# existing uploads get their documents.content_hash from `python -m app.cli backfill-content-hash`
+UPGRADE_STATEMENTS = [
+    # duplicate upload detection
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_owner_id_content_hash ON documents (owner_id, content_hash)",
+    # document list keyset pagination
+    "CREATE INDEX IF NOT EXISTS ix_documents_owner_id_id ON documents (owner_id, id)",
+    # ingest job kind (upload / reindex) and lease
+    "ALTER TABLE ingest_jobs ADD COLUMN IF NOT EXISTS kind VARCHAR NOT NULL DEFAULT 'upload'",
+    "ALTER TABLE ingest_jobs ADD COLUMN IF NOT EXISTS claimed_by VARCHAR",
+    "ALTER TABLE ingest_jobs ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP WITHOUT TIME ZONE",
+]
+
+def upgrade_schema():
+    with engine.begin() as conn:
+        for statement in UPGRADE_STATEMENTS:
+            conn.execute(text(statement))
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    upgrade_schema()
@@ -1,17 +1,70 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
+from app.core import metrics
+from app.core.config import DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set. Check your .env file.")
 
-engine = create_engine(DATABASE_URL)
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+# sync engine: background workers (ingest) and init_db
+engine = create_engine(DATABASE_URL, **POOL_OPTIONS)
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine,
-)
\ No newline at end of file
+)
+
+# async engine: request handlers
+# same database, asyncpg driver (ASYNC_DATABASE_URL overrides the derived URL)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (
+    make_url(DATABASE_URL).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **POOL_OPTIONS)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False, # objects stay readable after commit (no lazy IO in async)
+)
+
+
+# Pool statistics: new connections (counter, shows recycle / pre-ping churn) and usage gauges for /metrics
+_ENGINES = {"sync": engine, "async": async_engine.sync_engine}
+
+
+def _count_connects(name: str):
+    def on_connect(dbapi_connection, connection_record):
+        metrics.incr(f"db.{name}.connects")
+    return on_connect
+
+
+for _name, _engine in _ENGINES.items():
+    event.listen(_engine, "connect", _count_connects(_name))
+
+
+def update_pool_gauges():
+    """
+    checked out / idle / overflow connections of each engine (called when /metrics is read)
+    """
+    for name, pool_engine in _ENGINES.items():
+        pool = pool_engine.pool
+        metrics.set_gauge(f"db.{name}.pool_size", pool.size())
+        metrics.set_gauge(f"db.{name}.checked_out", pool.checkedout())
+        metrics.set_gauge(f"db.{name}.checked_in", pool.checkedin())
+        metrics.set_gauge(f"db.{name}.overflow", pool.overflow())
@@ -1,21 +1,62 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from app.db.init_db import init_db 
+from app.db.session import async_engine
 from app.api import health, users, auth, protected, documents
+from app.core.llm_gateway import LLMQueueFull
+from app.core.llm_pool import start_health_checks, stop_health_checks
+from app.core.ingest import resume_ingest_jobs, shutdown_ingest_workers
+from app.core.reranker import warm_up_reranker
+from app.core.security import PasswordWorkersBusy, start_password_workers, shutdown_password_workers
+from app.core.vector_store import warm_up_vectorstore, close_vectorstore
 
 # 서버가 시작될 때 실행할 로직 정의
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 서버 켜질 때: DB 테이블 생성
     init_db()
+    # vector DB 미리 열어두기 (첫 요청이 느려지지 않도록)
+    warm_up_vectorstore()
+    # re-ranking 모델도 미리 로드 (RERANK_MODEL 설정 시)
+    warm_up_reranker()
+    # LLM / embedding 서버 상태 주기적으로 확인 (죽은 서버는 요청에서 제외)
+    start_health_checks()
+    # bcrypt 전용 process pool 미리 띄우기 (로그인이 몰려도 다른 요청의 threadpool은 그대로)
+    start_password_workers()
+    # 이전 프로세스에서 끝나지 못한 ingest job 이어서 실행
+    resume_ingest_jobs()
     yield
-    # 서버 꺼질 때: (필요하면 여기에 정리 코드 작성)
+    # 서버 꺼질 때: ingest worker 정리 (실행 중이던 job은 다음 시작 때 재개)
+    shutdown_ingest_workers()
+    await stop_health_checks()
+    shutdown_password_workers()
+    close_vectorstore()
+    await async_engine.dispose()
 
 # lifespan을 FastAPI 앱에 등록
 app = FastAPI(title="Docs Backend v0.1", lifespan=lifespan)
 
+# LLM 대기열이 가득 차면 바로 429 (클라이언트는 Retry-After 후 재시도)
+@app.exception_handler(LLMQueueFull)
+async def llm_queue_full_handler(request: Request, exc: LLMQueueFull):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# 비밀번호 처리 대기열이 가득 차면 바로 429
+@app.exception_handler(PasswordWorkersBusy)
+async def password_workers_busy_handler(request: Request, exc: PasswordWorkersBusy):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many password operations in progress"},
+        headers={"Retry-After": "1"},
+    )
+
 app.include_router(health.router)
 app.include_router(users.router)
 app.include_router(auth.router)
 app.include_router(protected.router)
-app.include_router(documents.router)
\ No newline at end of file
+app.include_router(documents.router)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index
+from sqlalchemy.orm import deferred, relationship
 from app.models.user import Base # 기존 Base 가져오기
 
 class Document(Base):
@@ -7,10 +7,19 @@ class Document(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
-    content = Column(Text, nullable=True) # 문서 내용 (나중에 RAG용)
+    # legacy: text now lives in document_contents (app.core.content_store), only read as a fallback
+    content = deferred(Column(Text, nullable=True)) # 문서 내용 (나중에 RAG용)
     summary = Column(Text, nullable=True)
     file_path = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=True) # sha256 of the uploaded file
     owner_id = Column(Integer, ForeignKey("users.id")) # 누구 꺼니?
 
     # 유저 모델과의 관계 설정 (선택사항이지만 편리함)
     owner = relationship("User", back_populates="documents")
+
+    __table_args__ = (
+        # duplicate upload lookup: same owner, same file hash
+        Index("ix_documents_owner_id_content_hash", "owner_id", "content_hash"),
+        # document list: keyset pagination on (owner_id, id)
+        Index("ix_documents_owner_id_id", "owner_id", "id"),
+    )
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint
+from app.models.user import Base # 기존 Base 가져오기
+
+class DocumentChunk(Base):
+    """
+    one content-defined chunk of a document as currently indexed
+    (hash per chunk: an edited document only re-embeds chunks whose hash is new)
+    """
+    __tablename__ = "document_chunks"
+
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), index=True, nullable=False)
+    position = Column(Integer, nullable=False) # order in the document
+    content_hash = Column(String(64), nullable=False) # sha256 of the chunk text
+    vector_id = Column(String, nullable=False) # chunk ID in the vector store
+    length = Column(Integer, nullable=False) # characters
+
+    __table_args__ = (
+        UniqueConstraint("document_id", "position", name="uq_document_chunks_document_id_position"),
+    )
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, LargeBinary, ForeignKey
+from app.models.user import Base # 기존 Base 가져오기
+
+class DocumentContent(Base):
+    """
+    extracted text of a document, split into fixed-size compressed segments
+    (kept out of the documents row: metadata / ownership checks never load it,
+    and a range of the text only reads the segments it overlaps)
+    """
+    __tablename__ = "document_contents"
+
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    segment = Column(Integer, primary_key=True) # order in the document
+    start = Column(Integer, nullable=False) # character offset of the segment
+    length = Column(Integer, nullable=False) # characters
+    data = Column(LargeBinary, nullable=False) # zlib-compressed UTF-8 text
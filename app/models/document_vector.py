@@ -0,0 +1,28 @@
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index
+from app.core.config import EMBEDDING_DIMENSIONS
+from app.models.user import Base # 기존 Base 가져오기
+
+class DocumentVector(Base):
+    """
+    chunk vectors of the pgvector backend (VECTOR_BACKEND=pgvector)
+    id is the same deterministic chunk ID as document_chunks.vector_id
+    (only created when that backend is used: needs the pgvector extension)
+    """
+    __tablename__ = "document_vectors"
+
+    id = Column(String, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), index=True, nullable=False)
+    content = Column(Text, nullable=False) # chunk text
+    embedding = Column(Vector(EMBEDDING_DIMENSIONS), nullable=False)
+
+    __table_args__ = (
+        # approximate nearest neighbour search by cosine distance
+        Index(
+            "ix_document_vectors_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
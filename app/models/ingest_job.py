@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey
+from app.models.user import Base # 기존 Base 가져오기
+
+# job status
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# job kind
+JOB_KIND_UPLOAD = "upload" # parse the uploaded file, then index
+JOB_KIND_REINDEX = "reindex" # content was edited: re-chunk and index the stored content
+
+class IngestJob(Base):
+    """
+    One background ingestion run (parse -> chunk -> embed -> index) for a document.
+    Persisted so that unfinished jobs can be resumed after a restart.
+    """
+    __tablename__ = "ingest_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), index=True, nullable=False)
+    kind = Column(String, nullable=False, default=JOB_KIND_UPLOAD)
+    status = Column(String, nullable=False, default=JOB_QUEUED, index=True)
+    stage = Column(String, nullable=True) # parse / chunk / embed / index
+    progress = Column(Float, nullable=False, default=0.0) # 0.0 ~ 1.0 for the whole job
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    # lease: process (host:pid) owning the job and its last heartbeat; a stale lease is taken over
+    claimed_by = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
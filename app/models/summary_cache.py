@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from sqlalchemy import Column, String, Text, DateTime
+from app.models.user import Base # 기존 Base 가져오기
+
+class SummaryCache(Base):
+    """
+    LLM summary of one piece of text, keyed by sha256(kind + model + text)
+    (per-chunk partial summaries and reduce steps of map-reduce summarization)
+    """
+    __tablename__ = "summary_cache"
+
+    key = Column(String(64), primary_key=True)
+    model = Column(String, nullable=False)
+    summary = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import Optional, List
 
@@ -22,6 +23,39 @@ class DocumentResponse(DocumentBase):
         from_attributes = True
 
 
+class DocumentListItem(BaseModel):
+    """
+    one row of the document list (no content / summary: those can be megabytes per document)
+    """
+    id: int
+    title: str
+    owner_id: int
+    file_path: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class DocumentUploadResponse(DocumentResponse):
+    job_id: int # ingest job running in background
+    duplicate: bool = False # same file was already uploaded by this user: existing document is returned
+
+
+class IngestStatusResponse(BaseModel):
+    job_id: int = Field(validation_alias="id")
+    document_id: int
+    status: str # queued / running / done / failed
+    stage: Optional[str] = None # parse / chunk / embed / index
+    progress: float
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 class ChatRequest(BaseModel):
     question: str
 
@@ -30,3 +64,19 @@ class ChatResponse(BaseModel):
     question: str
     answer: str
     contexts: List[str] = Field(default_factory=list)
+
+
+class CollectionChatRequest(BaseModel):
+    question: str
+    doc_ids: Optional[List[int]] = None # None: all documents of the current user
+
+
+class ChatContext(BaseModel):
+    doc_id: int
+    text: str
+
+
+class CollectionChatResponse(BaseModel):
+    question: str
+    answer: str
+    contexts: List[ChatContext] = Field(default_factory=list)
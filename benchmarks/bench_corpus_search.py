@@ -0,0 +1,92 @@
+"""
+Corpus-wide retrieval latency as the number of documents grows.
+
+Compares, on a throw-away Chroma collection with random vectors:
+  - per-doc:  one similarity query per document (filter doc_id), like calling /chat N times
+  - corpus:   one query filtered by owner_id (what POST /documents/chat does)
+
+    python benchmarks/bench_corpus_search.py --docs 10 100 1000 --chunks 20 --dim 768
+"""
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import chromadb
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))]
+
+
+def random_vector(dim):
+    return [random.random() - 0.5 for _ in range(dim)]
+
+
+def build_collection(client, n_docs, chunks_per_doc, dim):
+    collection = client.create_collection(f"bench_{n_docs}")
+    ids, vectors, metadatas, documents = [], [], [], []
+    for doc_id in range(n_docs):
+        for position in range(chunks_per_doc):
+            ids.append(f"{doc_id}:{position}")
+            vectors.append(random_vector(dim))
+            # half of the corpus belongs to another owner, so the owner filter has work to do
+            metadatas.append({"doc_id": str(doc_id), "owner_id": str(doc_id % 2)})
+            documents.append(f"doc {doc_id} chunk {position}")
+            if len(ids) >= 5000:
+                collection.add(ids=ids, embeddings=vectors, metadatas=metadatas, documents=documents)
+                ids, vectors, metadatas, documents = [], [], [], []
+    if ids:
+        collection.add(ids=ids, embeddings=vectors, metadatas=metadatas, documents=documents)
+    return collection
+
+
+def run(n_docs, chunks_per_doc, dim, queries, k):
+    path = tempfile.mkdtemp(prefix="bench_chroma_")
+    try:
+        client = chromadb.PersistentClient(path=path)
+        collection = build_collection(client, n_docs, chunks_per_doc, dim)
+        owner_docs = [str(doc_id) for doc_id in range(n_docs) if doc_id % 2 == 0]
+
+        per_doc, corpus = [], []
+        for _ in range(queries):
+            query = random_vector(dim)
+
+            started = time.perf_counter()
+            for doc_id in owner_docs:
+                collection.query(query_embeddings=[query], n_results=k, where={"doc_id": doc_id})
+            per_doc.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            collection.query(query_embeddings=[query], n_results=k, where={"owner_id": "0"})
+            corpus.append(time.perf_counter() - started)
+
+        return per_doc, corpus
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--chunks", type=int, default=20, help="chunks per document")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("-k", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'docs':>6} {'chunks':>8} | {'per-doc p50':>12} {'p95':>9} | {'corpus p50':>11} {'p95':>9}")
+    for n_docs in args.docs:
+        per_doc, corpus = run(n_docs, args.chunks, args.dim, args.queries, args.k)
+        print(
+            f"{n_docs:>6} {n_docs * args.chunks:>8} | "
+            f"{statistics.median(per_doc) * 1000:>10.1f}ms {percentile(per_doc, 0.95) * 1000:>7.1f}ms | "
+            f"{statistics.median(corpus) * 1000:>9.1f}ms {percentile(corpus, 0.95) * 1000:>7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Chat latency during a login burst, against a running server.
+
+Measures p50/p95 of a steady stream of chat requests (POST /documents/{id}/chat) while idle,
+then while --logins concurrent logins hammer POST /auth/login. With bcrypt in the password
+process pool the two rows should be close; with bcrypt on the request threadpool the second
+row degrades as the threadpool fills up with hashing.
+
+Chat calls the LLM: point the server at the stub (benchmarks/stub_openai_server.py) so the
+LLM itself is not what is measured. Login throttling would stop the burst early, raise it:
+
+    python benchmarks/stub_openai_server.py --port 18001 --latency 0.05
+    LLM_ENDPOINTS=http://localhost:18001/v1 EMBEDDING_ENDPOINTS=http://localhost:18001 \\
+    LOGIN_MAX_ATTEMPTS_PER_IP=100000 LOGIN_MAX_FAILURES_PER_EMAIL=100000 uvicorn app.main:app
+    python benchmarks/bench_login_burst.py --email me@example.com --password secret --doc-id 1
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+
+import httpx
+
+# a new question for every chat request (both phases): a repeated one would be answered by the answer cache
+question_numbers = itertools.count()
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))]
+
+
+async def login(client, email, password):
+    response = await client.post("/auth/login", json={"email": email, "password": password})
+    return response
+
+
+async def chat_latencies(client, token, doc_id, seconds, interval):
+    latencies, errors = [], 0
+    headers = {"Authorization": f"Bearer {token}"}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        question = f"What is this document about? ({next(question_numbers)})"
+        started = time.perf_counter()
+        response = await client.post(f"/documents/{doc_id}/chat", json={"question": question}, headers=headers)
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors += 1
+        await asyncio.sleep(interval)
+    return latencies, errors
+
+
+async def login_burst(client, email, password, logins, concurrency, stop):
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses: dict[int, int] = {}
+
+    async def one():
+        async with semaphore:
+            if stop.is_set():
+                return
+            response = await login(client, email, password)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    return statuses, time.perf_counter() - started
+
+
+def report(label, latencies, errors):
+    if not latencies:
+        print(f"{label:>14} | no successful chat requests ({errors} errors)")
+        return
+    print(
+        f"{label:>14} | {len(latencies):>5} reqs {errors:>3} errors | "
+        f"p50 {statistics.median(latencies) * 1000:>7.1f}ms  p95 {percentile(latencies, 0.95) * 1000:>7.1f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--doc-id", type=int, required=True, help="a document owned by --email")
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each phase")
+    parser.add_argument("--interval", type=float, default=0.05, help="pause between chat requests")
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64, help="logins in flight at once")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency + 8)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120, limits=limits) as client:
+        response = await login(client, args.email, args.password)
+        response.raise_for_status()
+        token = response.json()["access_token"]
+
+        idle = await chat_latencies(client, token, args.doc_id, args.seconds, args.interval)
+        report("idle", *idle)
+
+        stop = asyncio.Event()
+        burst = asyncio.ensure_future(
+            login_burst(client, args.email, args.password, args.logins, args.concurrency, stop)
+        )
+        during = await chat_latencies(client, token, args.doc_id, args.seconds, args.interval)
+        stop.set()
+        statuses, elapsed = await burst
+        report("login burst", *during)
+        print(f"logins: {statuses} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
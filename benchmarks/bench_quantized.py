@@ -0,0 +1,159 @@
+"""
+Quantized vector index (VECTOR_BACKEND=quantized) vs the current Chroma collection.
+
+For every store: recall@k against exact cosine search, memory footprint and query latency
+of a corpus-wide (owner filtered) search.
+  - chroma:  float32 HNSW collection (current setup)
+  - int8 / binary:  QuantizedBackend, quantized codes in RAM + float32 re-rank from a memory-mapped file
+
+Synthetic clustered vectors by default; pass --vectors to use real embeddings (.npy, shape (n, dim)).
+
+    python benchmarks/bench_quantized.py --chunks 20000 100000 --dim 768 --rerank 8
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.vector_backends.quantized import QuantizedBackend  # noqa: E402
+
+CHUNKS_PER_DOC = 20
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))]
+
+
+def directory_bytes(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names
+    )
+
+
+def synthetic_vectors(n, dim, rng):
+    """
+    clustered vectors (embeddings of real text are far from uniformly spread)
+    """
+    centers = rng.normal(size=(max(16, n // 200), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors, owners, query, owner_id, k):
+    scores = vectors @ query
+    scores[owners != owner_id] = -np.inf
+    return set(np.argsort(-scores)[:k].tolist())
+
+
+def bench_chroma(vectors, owners, queries, truth, k):
+    import chromadb
+
+    path = tempfile.mkdtemp(prefix="bench_chroma_")
+    try:
+        client = chromadb.PersistentClient(path=path)
+        collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+        for start in range(0, len(vectors), 5000):
+            rows = range(start, min(start + 5000, len(vectors)))
+            collection.add(
+                ids=[str(row) for row in rows],
+                embeddings=vectors[start:rows.stop].tolist(),
+                metadatas=[{"doc_id": str(row // CHUNKS_PER_DOC), "owner_id": str(owners[row])} for row in rows],
+                documents=[str(row) for row in rows],
+            )
+
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            result = collection.query(query_embeddings=[query.tolist()], n_results=k, where={"owner_id": "0"})
+            latencies.append(time.perf_counter() - started)
+            hits += len(expected & {int(row) for row in result["ids"][0]})
+
+        # HNSW keeps every float32 vector in memory
+        memory = vectors.nbytes
+        return hits / (k * len(queries)), memory, directory_bytes(path), latencies
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def bench_quantized(vectors, owners, queries, truth, k, quantization, rerank):
+    path = tempfile.mkdtemp(prefix=f"bench_{quantization}_")
+    try:
+        backend = QuantizedBackend(path, dim=vectors.shape[1], quantization=quantization, rerank_factor=rerank)
+        backend.open()
+        for start in range(0, len(vectors), CHUNKS_PER_DOC):
+            rows = range(start, min(start + CHUNKS_PER_DOC, len(vectors)))
+            backend.upsert(
+                start // CHUNKS_PER_DOC,
+                int(owners[start]),
+                ids=[str(row) for row in rows],
+                vectors=vectors[start:rows.stop],
+                texts=[str(row) for row in rows],
+            )
+
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            result = backend.search(query, k=k, owner_id=0)
+            latencies.append(time.perf_counter() - started)
+            hits += len(expected & {int(chunk) for _, chunk in result})
+
+        memory = backend.memory_bytes()
+        backend.close()
+        return hits / (k * len(queries)), memory, directory_bytes(path), latencies
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--vectors", help=".npy file of real embeddings (overrides --dim, caps --chunks)")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--rerank", type=int, default=8, help="re-ranked candidates = k * rerank")
+    parser.add_argument("--stores", nargs="+", default=["chroma", "int8", "binary"])
+    parser.add_argument("-k", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    real = np.load(args.vectors).astype(np.float32) if args.vectors else None
+
+    print(f"{'chunks':>8} {'store':>7} | {'recall@k':>8} | {'RAM':>9} {'disk':>9} | {'p50':>8} {'p95':>8}")
+    for n in args.chunks:
+        if real is not None:
+            vectors = real[:n] / np.linalg.norm(real[:n], axis=1, keepdims=True)
+        else:
+            vectors = synthetic_vectors(n, args.dim, rng)
+        n = len(vectors)
+        # half of the documents belong to another owner, so the owner filter has work to do
+        owners = (np.arange(n) // CHUNKS_PER_DOC) % 2
+        # queries near stored chunks (a question is close to the chunk that answers it)
+        picked = vectors[rng.integers(0, n, args.queries)]
+        queries = picked + 0.3 * rng.normal(size=picked.shape).astype(np.float32) / np.sqrt(vectors.shape[1])
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        truth = [exact_top_k(vectors, owners, query, 0, args.k) for query in queries]
+
+        for store in args.stores:
+            if store == "chroma":
+                recall, memory, disk, latencies = bench_chroma(vectors, owners, queries, truth, args.k)
+            else:
+                recall, memory, disk, latencies = bench_quantized(
+                    vectors, owners, queries, truth, args.k, store, args.rerank
+                )
+            print(
+                f"{n:>8} {store:>7} | {recall:>8.3f} | "
+                f"{memory / 2**20:>7.1f}MB {disk / 2**20:>7.1f}MB | "
+                f"{statistics.median(latencies) * 1000:>6.1f}ms {percentile(latencies, 0.95) * 1000:>6.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
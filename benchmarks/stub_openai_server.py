@@ -0,0 +1,156 @@
+"""
+Stub LLM / embedding server for testing endpoint pools without Ollama.
+
+Speaks just enough of both APIs used by the backend:
+  - OpenAI-compatible:  GET /v1/models, POST /v1/chat/completions (stream and non-stream)
+  - Ollama:             GET /api/version, POST /api/embed
+
+Run two or more, point the backend at them and stop one to watch failover:
+
+    python benchmarks/stub_openai_server.py --port 18001 --latency 0.5
+    python benchmarks/stub_openai_server.py --port 18002 --latency 0.5 --fail-rate 0.2
+    LLM_ENDPOINTS=http://localhost:18001/v1,http://localhost:18002/v1 \\
+    EMBEDDING_ENDPOINTS=http://localhost:18001,http://localhost:18002 uvicorn app.main:app
+"""
+import argparse
+import hashlib
+import json
+import random
+import struct
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def stub_embedding(text, dim):
+    """
+    deterministic pseudo-embedding (same text -> same vector on every stub)
+    """
+    values = []
+    counter = 0
+    while len(values) < dim:
+        digest = hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+        values.extend(value / 2**31 for value in struct.unpack(">8i", digest))
+        counter += 1
+    return values[:dim]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "StubLLM/0.1"
+
+    def log_message(self, format, *args):
+        if self.server.options.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _maybe_fail(self):
+        options = self.server.options
+        if random.random() < options.fail_rate:
+            self._send_json(500, {"error": {"message": "stub failure", "type": "server_error"}})
+            return True
+        return False
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": self.server.options.model, "object": "model"}]})
+        elif self.path.rstrip("/") == "/api/version":
+            self._send_json(200, {"version": "stub"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        options = self.server.options
+        payload = self._read_json()
+        self.server.requests += 1
+
+        if self.path.rstrip("/") == "/api/embed":
+            if self._maybe_fail():
+                return
+            inputs = payload.get("input", [])
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            time.sleep(options.embed_latency)
+            self._send_json(200, {
+                "model": payload.get("model"),
+                "embeddings": [stub_embedding(text, options.dim) for text in inputs],
+            })
+            return
+
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": "not found"})
+            return
+        if self._maybe_fail():
+            return
+
+        prompt = " ".join(message.get("content", "") for message in payload.get("messages", []))
+        answer = f"[stub :{self.server.server_port}] {len(prompt)} chars received."
+        words = answer.split(" ")
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(words), "total_tokens": 0}
+        created = int(time.time())
+
+        time.sleep(options.latency) # prefill
+        if not payload.get("stream"):
+            self._send_json(200, {
+                "id": "stub", "object": "chat.completion", "created": created, "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+
+        def send(chunk):
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        for i, word in enumerate(words):
+            send({
+                "id": "stub", "object": "chat.completion.chunk", "created": created, "model": payload.get("model"),
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else f" {word}"}, "finish_reason": None}],
+            })
+            time.sleep(options.token_latency)
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            send({
+                "id": "stub", "object": "chat.completion.chunk", "created": created, "model": payload.get("model"),
+                "choices": [], "usage": usage,
+            })
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=18001)
+    parser.add_argument("--model", default="qwen3:14b")
+    parser.add_argument("--dim", type=int, default=768, help="embedding dimensions")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="seconds between streamed tokens")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="seconds per embedding request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--verbose", action="store_true")
+    options = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", options.port), StubHandler)
+    server.options = options
+    server.requests = 0
+    print(f"Stub LLM server on http://127.0.0.1:{options.port} (OpenAI /v1 + Ollama /api)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{server.requests} requests served.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import time
 import streamlit as st
 import requests
 
@@ -35,7 +36,9 @@ with st.sidebar:
 
     if st.session_state.token:
         st.header("upload docs")
-        uploaded_file = st.file_uploader("upload PDF/TXT files", type=["pdf","txt"])
+        uploaded_file = st.file_uploader(
+            "upload documents", type=["pdf", "txt", "docx", "html", "htm", "md", "csv", "tsv"]
+        )
 
         # 1. upload new doc
         if st.button("upload and process"):
@@ -43,25 +46,49 @@ with st.sidebar:
                 headers = {"Authorization": f"Bearer {st.session_state.token}"}
                 files = {"file": (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)}
 
-                with st.spinner("uploading doc and saving vector DB..."):
+                with st.spinner("uploading doc..."):
                     res = requests.post(f"{API_URL}/documents/upload", headers=headers, files=files)
-                    if res.status_code == 200:
-                        st.session_state.doc_id = res.json().get("id")
-                        # initialize chat history since new doc is uploaded
-                        st.session_state.messages = []
-                        st.success(f"upload completed! (doc ID: {st.session_state.doc_id})")
+                if res.status_code == 200:
+                    st.session_state.doc_id = res.json().get("id")
+                    # initialize chat history since new doc is uploaded
+                    st.session_state.messages = []
+
+                    # text extraction & vector DB run in background: poll job status
+                    progress_bar = st.progress(0.0, text="waiting for ingest job...")
+                    while True:
+                        status_res = requests.get(
+                            f"{API_URL}/documents/{st.session_state.doc_id}/ingest-status", headers=headers
+                        )
+                        if status_res.status_code != 200:
+                            break
+                        job = status_res.json()
+                        progress_bar.progress(job["progress"], text=f"{job['status']} {job.get('stage') or ''}")
+                        if job["status"] in ("done", "failed"):
+                            break
+                        time.sleep(1)
+
+                    if status_res.status_code == 200 and job["status"] == "failed":
+                        st.error(f"ingest failed: {job.get('error')}")
                     else:
-                        st.error(f"upload failed: {res.text}")
+                        st.success(f"upload completed! (doc ID: {st.session_state.doc_id})")
+                else:
+                    st.error(f"upload failed: {res.text}")
 
         st.divider()
 
         # 2. load uploaded doc
         st.subheader("My docs")
         headers = {"Authorization": f"Bearer {st.session_state.token}"}
-        res = requests.get(f"{API_URL}/documents/", headers=headers)
-
+        # list is fetched on every rerun: send the ETag of the cached list, 304 means unchanged
+        if st.session_state.get("docs_etag"):
+            headers["If-None-Match"] = st.session_state.docs_etag
+        res = requests.get(f"{API_URL}/documents/", headers=headers, params={"limit": 100})
         if res.status_code == 200:
-            docs = res.json()
+            st.session_state.docs_cache = res.json()
+            st.session_state.docs_etag = res.headers.get("ETag")
+
+        if res.status_code in (200, 304):
+            docs = st.session_state.docs_cache
             if docs:
                 # make dictionary of doc list {id: title}
                 doc_options = {doc["id"]: f"[{doc['title']}] {doc['title']}" for doc in docs}
@@ -89,6 +116,8 @@ if st.session_state.doc_id:
             res = requests.post(f"{API_URL}/documents/{st.session_state.doc_id}/summarize", headers=headers)
             if res.status_code == 200:
                 st.info(res.json().get("summary"))
+            elif res.status_code == 429:
+                st.warning(f"AI is busy, try again in {res.headers.get('Retry-After', '?')}s")
             else:
                 st.error("summarization failed")
 
@@ -122,6 +151,8 @@ if st.session_state.doc_id:
                     st.markdown(answer)
                     # save answer to session
                     st.session_state.message.append({"role": "assistant", "content": answer})
+                elif res.status_code == 429:
+                    st.warning(f"AI is busy, try again in {res.headers.get('Retry-After', '?')}s")
                 else:
                     st.error(f"Failed to answer: {res.text}")
 else:
@@ -0,0 +1,72 @@
+import time
+
+import numpy as np
+
+from app.core.answer_cache import SemanticAnswerCache, question_guard
+
+
+def make_cache(**kwargs) -> SemanticAnswerCache:
+    options = {"max_entries": 1024, "ttl_seconds": 60, "threshold": 0.95}
+    options.update(kwargs)
+    return SemanticAnswerCache(**options)
+
+
+def nearby(vector: np.ndarray, seed: int) -> list[float]:
+    """
+    a vector with cosine ~0.99 to `vector` (a rephrased question)
+    """
+    noise = np.random.default_rng(seed).normal(size=len(vector))
+    return list(vector + 0.1 * noise / np.linalg.norm(noise) * np.linalg.norm(vector))
+
+
+def test_rephrased_question_hits():
+    cache = make_cache()
+    vector = np.random.default_rng(0).normal(size=768)
+    cache.store(1, "What is the revenue target?", list(vector), "10M", ["ctx"])
+
+    hit = cache.lookup(1, "what's the revenue target", nearby(vector, 1))
+    assert hit is not None and hit.answer == "10M"
+    assert cache.lookup(2, "What is the revenue target?", list(vector)) is None
+
+
+def test_questions_differing_by_number_or_negation_miss():
+    cache = make_cache()
+    vector = np.random.default_rng(0).normal(size=768)
+    cache.store(1, "What was the revenue in 2022?", list(vector), "8M", [])
+    cache.store(1, "Which costs are covered?", list(-vector), "travel", [])
+
+    # embeddings of such pairs are nearly identical: only the guard tells them apart
+    assert cache.lookup(1, "What was the revenue in 2023?", nearby(vector, 1)) is None
+    assert cache.lookup(1, "What was the revenue in 2022", nearby(vector, 2)).answer == "8M"
+    assert cache.lookup(1, "Which costs are not covered?", nearby(-vector, 3)) is None
+    assert cache.lookup(1, "Which costs aren't covered?", nearby(-vector, 4)) is None
+    assert cache.lookup(1, "어떤 비용이 포함되지 않나요?", nearby(-vector, 5)) is None
+
+
+def test_guard():
+    assert question_guard("revenue in 2022 and Q3") == (("2022", "3"), 0)
+    assert question_guard("is it not covered?") == question_guard("isn't it covered?")
+    assert question_guard("is it covered?") != question_guard("is it never covered?")
+
+
+def test_best_match_with_same_guard_wins():
+    cache = make_cache(threshold=0.5)
+    vector = np.random.default_rng(0).normal(size=768)
+    cache.store(1, "revenue in 2023?", list(vector), "2023 answer", [])
+    cache.store(1, "revenue in 2022?", nearby(vector, 1), "2022 answer", [])
+
+    assert cache.lookup(1, "revenue for 2022?", list(vector)).answer == "2022 answer"
+
+
+def test_expired_and_invalidated_entries_miss():
+    cache = make_cache(ttl_seconds=0.05)
+    vector = list(np.random.default_rng(0).normal(size=768))
+    cache.store(1, "question", vector, "answer", [])
+    assert cache.lookup(1, "question", vector) is not None
+    time.sleep(0.06)
+    assert cache.lookup(1, "question", vector) is None
+
+    cache = make_cache()
+    cache.store(1, "question", vector, "answer", [])
+    cache.invalidate(1)
+    assert cache.lookup(1, "question", vector) is None
@@ -0,0 +1,53 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+from app.core.embeddings import BatchedEmbeddings, EmbeddingCache, content_hash
+
+
+class BlockingEmbeddings(Embeddings):
+    """
+    embed_documents waits until `release` is set (an ingest stuck on a slow server), embed_query does not
+    """
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.batches_started = threading.Semaphore(0)
+
+    def embed_documents(self, texts):
+        self.batches_started.release()
+        self.release.wait(timeout=10)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 0.0]
+
+
+def test_query_is_not_queued_behind_running_ingest():
+    base = BlockingEmbeddings()
+    embeddings = BatchedEmbeddings(base, "test", EmbeddingCache(":memory:"), batch_size=1, concurrency=2)
+    with ThreadPoolExecutor(max_workers=1) as ingest:
+        # 20 batches: both embed workers busy, 18 more waiting in the executor
+        future = ingest.submit(embeddings.embed_many, [f"chunk {i}" for i in range(20)])
+        assert base.batches_started.acquire(timeout=5)
+        assert base.batches_started.acquire(timeout=5)
+
+        query = ThreadPoolExecutor(max_workers=1).submit(embeddings.embed_query, "question?")
+        assert query.result(timeout=2) == [9.0, 0.0]
+        assert not future.done()
+
+        base.release.set()
+        assert len(future.result(timeout=10)) == 20
+    embeddings.close()
+
+
+def test_query_reads_cache_but_does_not_write_it():
+    cache = EmbeddingCache(":memory:")
+    embeddings = BatchedEmbeddings(BlockingEmbeddings(), "test", cache)
+    cache.put_many("test", {content_hash("known chunk"): [1.0, 2.0]})
+
+    assert embeddings.embed_query("known chunk") == [1.0, 2.0]
+    assert embeddings.embed_query("new question") == [12.0, 0.0]
+    assert cache.get_many("test", [content_hash("new question")]) == {}
+    embeddings.close()
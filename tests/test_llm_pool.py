@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from app.core.llm_pool import Endpoint, EndpointPool
+
+
+async def probe(endpoint):
+    return True
+
+
+def make_pool() -> EndpointPool:
+    return EndpointPool("test", [Endpoint("a", "client-a"), Endpoint("b", "client-b")], (ConnectionError,), probe)
+
+
+def test_cancelled_call_releases_endpoint():
+    pool = make_pool()
+
+    async def hang(client):
+        await asyncio.sleep(10)
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pool.call(hang), 0.05)
+
+    asyncio.run(main())
+    assert [endpoint.outstanding for endpoint in pool.endpoints] == [0, 0]
+    # a cancelled call says nothing about the endpoint's health
+    assert all(endpoint.healthy for endpoint in pool.endpoints)
+
+
+def test_cancelled_stream_releases_endpoint():
+    pool = make_pool()
+
+    async def open_stream(client):
+        return client
+
+    async def consume():
+        async with pool.stream(open_stream):
+            await asyncio.sleep(10)
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(consume(), 0.05)
+
+    asyncio.run(main())
+    assert [endpoint.outstanding for endpoint in pool.endpoints] == [0, 0]
+
+
+def test_failover_releases_both_endpoints():
+    pool = make_pool()
+    calls = []
+
+    async def flaky(client):
+        calls.append(client)
+        if len(calls) == 1:
+            raise ConnectionError("down")
+        return client
+
+    result = asyncio.run(pool.call(flaky))
+    assert result == calls[1] != calls[0]
+    assert [endpoint.outstanding for endpoint in pool.endpoints] == [0, 0]
+    assert sorted(endpoint.healthy for endpoint in pool.endpoints) == [False, True]
+
+
+def test_non_retriable_error_is_raised_without_failover():
+    pool = make_pool()
+
+    def broken(client):
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        pool.call_sync(broken)
+    assert [endpoint.outstanding for endpoint in pool.endpoints] == [0, 0]
+    assert all(endpoint.healthy for endpoint in pool.endpoints)
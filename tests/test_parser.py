@@ -0,0 +1,18 @@
+import pytest
+
+from app.core.parser import UnsupportedFormat, iter_file_pages
+
+
+def test_unknown_binary_format_raises(tmp_path):
+    path = tmp_path / "archive.bin"
+    path.write_bytes(b"\x7fELF\x02\x01\x01\x00" + bytes(range(256)) * 4)
+
+    with pytest.raises(UnsupportedFormat):
+        list(iter_file_pages(str(path)))
+
+
+def test_text_file_is_parsed(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("first line\nsecond line\n", encoding="utf-8")
+
+    assert "".join(page.text for page in iter_file_pages(str(path))) == "first line\nsecond line\n"